@@ -1,51 +1,66 @@
 #!/usr/bin/env python3
 """
 Add Z.ai metadata to PDF files
+
+Uses the stamping module of the pdf skill (skills/pdf/scripts/zai_metadata.py)
+with this project's defaults: the filename as title, 'Z.ai PDF Generator' as
+producer and a default subject.
 """
 import sys
 import os
-from pypdf import PdfReader, PdfWriter
+import importlib.util
+
+SKILL_SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'skills', 'pdf', 'scripts')
+
+def _load_skill_module(name):
+    """Import a module of the pdf skill by file path, without changing sys.path."""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SKILL_SCRIPTS_DIR, name + '.py'))
+    module = importlib.util.module_from_spec(spec)
+    # Registered first so the skill's own flat imports of it resolve
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+# zai_metadata imports incremental_metadata by its bare name
+_load_skill_module('incremental_metadata')
+zai_metadata = _load_skill_module('zai_metadata')
+
+ZAI_FIELDS = dict(zai_metadata.ZAI_FIELDS, **{'/Producer': 'Z.ai PDF Generator'})
+DEFAULTS = {'/Subject': 'Technical documentation'}
+
+def add_metadata(input_path, output_path=None, title=None, force=False):
+    """Add Z.ai metadata to PDF
 
-def add_metadata(input_path, output_path=None, title=None):
-    """Add Z.ai metadata to PDF"""
+    Files that already carry the metadata are skipped. Otherwise it is
+    appended as an incremental update when possible; encrypted or damaged
+    files are rewritten page by page. Returns the zai_metadata.StampResult;
+    errors are raised as by zai_metadata.stamp_pdf().
+    """
     if output_path is None:
         output_path = input_path
-    
-    if title is None:
-        title = os.path.splitext(os.path.basename(input_path))[0]
-    
-    reader = PdfReader(input_path)
-    writer = PdfWriter()
-    
-    for page in reader.pages:
-        writer.add_page(page)
-    
-    # Copy existing metadata if available
-    existing_meta = reader.metadata or {}
-    
-    # Add Z.ai metadata
-    writer.add_metadata({
-        '/Title': title,
-        '/Author': 'Z.ai',
-        '/Creator': 'Z.ai',
-        '/Subject': existing_meta.get('/Subject', 'Technical documentation'),
-        '/Producer': 'Z.ai PDF Generator',
-    })
-    
-    with open(output_path, 'wb') as f:
-        writer.write(f)
-    
-    print(f"✓ Added Z.ai metadata to: {output_path}")
+
+    # Keep the existing subject if there is one
+    result = zai_metadata.stamp_pdf(input_path, output_path, title=title, keep_title=False,
+                                    fields=ZAI_FIELDS, defaults=DEFAULTS, force=force)
+
+    if result.status == 'skipped':
+        print(f"- Z.ai metadata already present, skipped: {output_path}")
+    else:
+        print(f"✓ Added Z.ai metadata to: {output_path}")
+    return result
 
 if __name__ == '__main__':
     if len(sys.argv) < 2:
-        print("Usage: python add_zai_metadata.py <input.pdf> [-o output.pdf] [-t title]")
+        print("Usage: python add_zai_metadata.py <input.pdf> [-o output.pdf] [-t title] [--force]")
         sys.exit(1)
-    
+
     input_file = sys.argv[1]
     output_file = None
     title = None
-    
+    force = False
+
     i = 2
     while i < len(sys.argv):
         if sys.argv[i] == '-o' and i + 1 < len(sys.argv):
@@ -54,7 +69,10 @@ if __name__ == '__main__':
         elif sys.argv[i] == '-t' and i + 1 < len(sys.argv):
             title = sys.argv[i + 1]
             i += 2
+        elif sys.argv[i] == '--force':
+            force = True
+            i += 1
         else:
             i += 1
-    
-    add_metadata(input_file, output_file, title)
+
+    add_metadata(input_file, output_file, title, force)
@@ -4,17 +4,54 @@ Tool to pack a directory into a .docx, .pptx, or .xlsx file with XML formatting
 
 Example usage:
     python pack.py <input_directory> <office_file> [--force]
+
+Long-running callers that pack many documents can keep headless soffice
+instances warm between validations:
+
+    from ooxml.scripts.pack import pack_document, start_validation_pool
+
+    start_validation_pool(size=2)
+    pack_document("unpacked", "out.docx", validate=True)
 """
 
 import argparse
+import atexit
+import hashlib
+import json
+import os
+import queue
 import shutil
 import subprocess
 import sys
 import tempfile
+import threading
+import time
+import uuid
 import defusedxml.minidom
 import zipfile
 from pathlib import Path
 
+try:
+    import uno
+except ImportError:  # LibreOffice's Python bindings are optional
+    uno = None
+
+# Filter passed to soffice for each Office format
+VALIDATION_FILTERS = {
+    ".docx": "html:HTML",
+    ".pptx": "html:impress_html_Export",
+    ".xlsx": "html:HTML (StarCalc)",
+}
+
+# Seconds allowed for a single conversion before it is treated as a failure
+VALIDATION_TIMEOUT = 10
+
+# Line map sidecar written by unpack.py (must match unpack.LINE_MAP_NAME)
+LINE_MAP_NAME = ".linemap.json"
+
+# Shared pool used by validate_document() once start_validation_pool() is called
+_validation_pool = None
+
 
 def main():
     parser = argparse.ArgumentParser(description="Pack a directory into an Office file")
@@ -61,61 +98,64 @@ def pack_document(input_dir, output_file, validate=False):
     if output_file.suffix.lower() not in {".docx", ".pptx", ".xlsx"}:
         raise ValueError(f"{output_file} must be a .docx, .pptx, or .xlsx file")
 
-    # Work in temporary directory to avoid modifying original
-    with tempfile.TemporaryDirectory() as temp_dir:
-        temp_content_dir = Path(temp_dir) / "content"
-        shutil.copytree(input_dir, temp_content_dir)
-
-        # Process XML files to remove pretty-printing whitespace
-        for pattern in ["*.xml", "*.rels"]:
-            for xml_file in temp_content_dir.rglob(pattern):
-                condense_xml(xml_file)
-
-        # Create final Office file as zip archive
-        output_file.parent.mkdir(parents=True, exist_ok=True)
-        with zipfile.ZipFile(output_file, "w", zipfile.ZIP_DEFLATED) as zf:
-            for f in temp_content_dir.rglob("*"):
-                if f.is_file():
-                    zf.write(f, f.relative_to(temp_content_dir))
-
-        # Validate if requested
-        if validate:
-            if not validate_document(output_file):
-                output_file.unlink()  # Delete the corrupt file
-                return False
+    # Parts left untouched since unpack are copied from the source archive
+    # instead of being parsed and re-serialized
+    original_parts = _load_unchanged_parts(input_dir)
+
+    # Create final Office file as zip archive, condensing edited XML on the way
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(output_file, "w", zipfile.ZIP_DEFLATED) as zf:
+        for f in input_dir.rglob("*"):
+            if not f.is_file() or f == input_dir / LINE_MAP_NAME:
+                continue
+            name = f.relative_to(input_dir).as_posix()
+            if name in original_parts:
+                zf.writestr(name, original_parts[name])
+            elif f.name.endswith((".xml", ".rels")):
+                zf.writestr(name, _condensed_xml_bytes(f))
+            else:
+                zf.write(f, name)
+
+    # Validate if requested
+    if validate:
+        if not validate_document(output_file):
+            output_file.unlink()  # Delete the corrupt file
+            return False
 
     return True
 
 
 def validate_document(doc_path):
-    """Validate document by converting to HTML with soffice."""
-    # Determine the correct filter based on file extension
-    match doc_path.suffix.lower():
-        case ".docx":
-            filter_name = "html:HTML"
-        case ".pptx":
-            filter_name = "html:impress_html_Export"
-        case ".xlsx":
-            filter_name = "html:HTML (StarCalc)"
+    """Validate document by converting to HTML with soffice.
+
+    Uses the shared soffice pool when one has been started with
+    start_validation_pool(), otherwise spawns a one-off soffice process.
+    """
+    doc_path = Path(doc_path)
+    filter_name = VALIDATION_FILTERS[doc_path.suffix.lower()]
 
     with tempfile.TemporaryDirectory() as temp_dir:
         try:
-            result = subprocess.run(
-                [
-                    "soffice",
-                    "--headless",
-                    "--convert-to",
-                    filter_name,
-                    "--outdir",
-                    temp_dir,
-                    str(doc_path),
-                ],
-                capture_output=True,
-                timeout=10,
-                text=True,
-            )
-            if not (Path(temp_dir) / f"{doc_path.stem}.html").exists():
+            if _validation_pool is not None:
+                _validation_pool.convert(doc_path, filter_name, temp_dir)
+                error_msg = "Document validation failed"
+            else:
+                result = subprocess.run(
+                    [
+                        "soffice",
+                        "--headless",
+                        "--convert-to",
+                        filter_name,
+                        "--outdir",
+                        temp_dir,
+                        str(doc_path),
+                    ],
+                    capture_output=True,
+                    timeout=VALIDATION_TIMEOUT,
+                    text=True,
+                )
                 error_msg = result.stderr.strip() or "Document validation failed"
+            if not (Path(temp_dir) / f"{doc_path.stem}.html").exists():
                 print(f"Validation error: {error_msg}", file=sys.stderr)
                 return False
             return True
@@ -130,8 +170,231 @@ def validate_document(doc_path):
             return False
 
 
+def start_validation_pool(size=1, max_queue=8, timeout=VALIDATION_TIMEOUT):
+    """Start long-lived headless soffice workers for validate_document().
+
+    Requires LibreOffice's Python bindings (``uno``). Calling this again
+    replaces the existing pool.
+
+    Args:
+        size: Number of soffice processes to keep running
+        max_queue: Maximum number of validations waiting for a free worker
+        timeout: Seconds allowed per conversion before the worker is restarted
+
+    Returns:
+        SofficePool: The started pool
+    """
+    global _validation_pool
+    stop_validation_pool()
+    _validation_pool = SofficePool(size=size, max_queue=max_queue, timeout=timeout)
+    return _validation_pool
+
+
+def stop_validation_pool():
+    """Shut down the shared soffice pool, if any."""
+    global _validation_pool
+    if _validation_pool is not None:
+        _validation_pool.close()
+        _validation_pool = None
+
+
+atexit.register(stop_validation_pool)
+
+
+class SofficePool:
+    """Bounded pool of headless soffice processes reused across conversions.
+
+    Each worker listens on its own UNO pipe with a private user profile, so
+    conversions only pay for loading and exporting the document rather than
+    for LibreOffice start-up. Workers are health-checked before every
+    conversion and restarted if they crashed or hit the timeout.
+    """
+
+    def __init__(self, size=1, max_queue=8, timeout=VALIDATION_TIMEOUT):
+        if uno is None:
+            raise RuntimeError(
+                "LibreOffice Python bindings (uno) are required for the soffice pool"
+            )
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.timeout = timeout
+        self._idle = queue.Queue()
+        self._slots = threading.BoundedSemaphore(size + max_queue)
+        self._workers = [_SofficeWorker(timeout) for _ in range(size)]
+        for worker in self._workers:
+            worker.start()
+            self._idle.put(worker)
+
+    def convert(self, doc_path, filter_name, outdir):
+        """Convert doc_path into outdir using the soffice filter ("ext:Filter").
+
+        Raises:
+            RuntimeError: If the queue is full or no worker becomes available
+            subprocess.TimeoutExpired: If the conversion exceeds the timeout
+        """
+        if not self._slots.acquire(blocking=False):
+            raise RuntimeError("Validation queue is full")
+        try:
+            try:
+                worker = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                raise RuntimeError("No soffice worker became available") from None
+            try:
+                worker.convert(doc_path, filter_name, outdir)
+            finally:
+                self._idle.put(worker)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Terminate all workers and remove their profiles."""
+        for worker in self._workers:
+            worker.stop()
+        self._workers = []
+
+
+class _SofficeWorker:
+    """A single headless soffice process driven over a UNO pipe."""
+
+    STARTUP_TIMEOUT = 30
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self._process = None
+        self._profile_dir = None
+        self._desktop = None
+
+    def start(self):
+        """Launch soffice and wait until its UNO pipe accepts connections."""
+        self._profile_dir = tempfile.mkdtemp(prefix="soffice-profile-")
+        pipe_name = f"pack_validate_{os.getpid()}_{uuid.uuid4().hex}"
+        self._process = subprocess.Popen(
+            [
+                "soffice",
+                "--headless",
+                "--invisible",
+                "--nologo",
+                "--norestore",
+                "--nodefault",
+                f"-env:UserInstallation={Path(self._profile_dir).as_uri()}",
+                f"--accept=pipe,name={pipe_name};urp;StarOffice.ComponentContext",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+        local_context = uno.getComponentContext()
+        resolver = local_context.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local_context
+        )
+        deadline = time.monotonic() + self.STARTUP_TIMEOUT
+        while True:
+            try:
+                context = resolver.resolve(
+                    f"uno:pipe,name={pipe_name};urp;StarOffice.ComponentContext"
+                )
+                break
+            except Exception:
+                if self._process.poll() is not None or time.monotonic() > deadline:
+                    self.stop()
+                    raise RuntimeError("soffice worker failed to start")
+                time.sleep(0.1)
+        self._desktop = context.ServiceManager.createInstanceWithContext(
+            "com.sun.star.frame.Desktop", context
+        )
+
+    def stop(self):
+        """Terminate the soffice process and remove its profile."""
+        self._desktop = None
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+        self._process = None
+        if self._profile_dir:
+            shutil.rmtree(self._profile_dir, ignore_errors=True)
+            self._profile_dir = None
+
+    def restart(self):
+        self.stop()
+        self.start()
+
+    def is_healthy(self):
+        """Check that the process is alive and still answers UNO calls."""
+        if self._process is None or self._process.poll() is not None:
+            return False
+        try:
+            self._desktop.getComponents()
+            return True
+        except Exception:
+            return False
+
+    def convert(self, doc_path, filter_name, outdir):
+        """Export doc_path to outdir, killing the process if it hangs."""
+        if not self.is_healthy():
+            self.restart()
+
+        extension, filter_name = filter_name.split(":", 1)
+        source_url = Path(doc_path).resolve().as_uri()
+        target_path = Path(outdir) / f"{Path(doc_path).stem}.{extension}"
+        target_url = target_path.resolve().as_uri()
+
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            self._process.kill()
+
+        watchdog = threading.Timer(self.timeout, kill)
+        watchdog.start()
+        document = None
+        try:
+            document = self._desktop.loadComponentFromURL(
+                source_url, "_blank", 0, _uno_properties(Hidden=True, ReadOnly=True)
+            )
+            if document is None:
+                raise RuntimeError("soffice could not load the document")
+            document.storeToURL(target_url, _uno_properties(FilterName=filter_name))
+        except Exception:
+            if timed_out.is_set():
+                self.restart()
+                raise subprocess.TimeoutExpired("soffice", self.timeout) from None
+            if not self.is_healthy():
+                self.restart()
+            raise
+        finally:
+            watchdog.cancel()
+            if document is not None and not timed_out.is_set():
+                try:
+                    document.close(True)
+                except Exception:
+                    pass
+
+
+def _uno_properties(**kwargs):
+    """Build a tuple of UNO PropertyValue structs from keyword arguments."""
+    properties = []
+    for name, value in kwargs.items():
+        prop = uno.createUnoStruct("com.sun.star.beans.PropertyValue")
+        prop.Name = name
+        prop.Value = value
+        properties.append(prop)
+    return tuple(properties)
+
+
 def condense_xml(xml_file):
     """Strip unnecessary whitespace and remove comments."""
+    content = _condensed_xml_bytes(xml_file)
+
+    # Write back the condensed XML
+    with open(xml_file, "wb") as f:
+        f.write(content)
+
+
+def _condensed_xml_bytes(xml_file):
     with open(xml_file, "r", encoding="utf-8") as f:
         dom = defusedxml.minidom.parse(f)
 
@@ -150,9 +413,39 @@ def condense_xml(xml_file):
             ) or child.nodeType == child.COMMENT_NODE:
                 element.removeChild(child)
 
-    # Write back the condensed XML
-    with open(xml_file, "wb") as f:
-        f.write(dom.toxml(encoding="UTF-8"))
+    return dom.toxml(encoding="UTF-8")
+
+
+def _load_unchanged_parts(input_dir):
+    """Return {part name: archived bytes} for parts not edited since unpack.
+
+    Relies on the line map sidecar written by unpack.py. Returns an empty dict
+    if there is no sidecar or the source archive changed since unpacking.
+    """
+    sidecar = input_dir / LINE_MAP_NAME
+    if not sidecar.exists():
+        return {}
+    try:
+        line_map = json.loads(sidecar.read_text(encoding="utf-8"))
+        source = Path(line_map["source"])
+        source_stat = source.stat()
+        if (
+            source_stat.st_size != line_map["source_size"]
+            or source_stat.st_mtime_ns != line_map["source_mtime_ns"]
+        ):
+            return {}
+        unchanged = {}
+        with zipfile.ZipFile(source) as zf:
+            for name, part in line_map["parts"].items():
+                path = input_dir / name
+                if not path.is_file():
+                    continue
+                digest = hashlib.sha256(path.read_bytes()).hexdigest()
+                if digest == part["sha256"]:
+                    unchanged[name] = zf.read(name)
+        return unchanged
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return {}
 
 
 if __name__ == "__main__":
@@ -1,29 +1,285 @@
 #!/usr/bin/env python3
-"""Unpack and format XML contents of Office files (.docx, .pptx, .xlsx)"""
+"""
+Unpack and format XML contents of Office files (.docx, .pptx, .xlsx).
 
+Example usage:
+    python unpack.py <office_file> <output_dir> [--jobs N] [--skip-pretty customXml/]
+"""
+
+import argparse
+import bisect
+import hashlib
+import json
 import random
+import shutil
 import sys
-import defusedxml.minidom
+import xml.parsers.expat
 import zipfile
-from pathlib import Path
-
-# Get command line arguments
-assert len(sys.argv) == 3, "Usage: python unpack.py <office_file> <output_dir>"
-input_file, output_dir = sys.argv[1], sys.argv[2]
-
-# Extract and format
-output_path = Path(output_dir)
-output_path.mkdir(parents=True, exist_ok=True)
-zipfile.ZipFile(input_file).extractall(output_path)
-
-# Pretty print all XML files
-xml_files = list(output_path.rglob("*.xml")) + list(output_path.rglob("*.rels"))
-for xml_file in xml_files:
-    content = xml_file.read_text(encoding="utf-8")
-    dom = defusedxml.minidom.parseString(content)
-    xml_file.write_bytes(dom.toprettyxml(indent="  ", encoding="ascii"))
-
-# For .docx files, suggest an RSID for tracked changes
-if input_file.endswith(".docx"):
-    suggested_rsid = "".join(random.choices("0123456789ABCDEF", k=8))
-    print(f"Suggested RSID for edit session: {suggested_rsid}")
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path, PurePosixPath
+
+import lxml.etree
+
+# Parts at least this large are pretty-printed in a worker process
+PARALLEL_THRESHOLD = 1024 * 1024
+
+# Sidecar written to the output root; pack.py skips it and uses it to reuse
+# untouched parts from the source archive
+LINE_MAP_NAME = ".linemap.json"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Unpack an Office file")
+    parser.add_argument("input_file", help="Office file (.docx/.pptx/.xlsx)")
+    parser.add_argument("output_dir", help="Directory to unpack into")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Worker processes for large parts (default: CPU count)",
+    )
+    parser.add_argument(
+        "--skip-pretty",
+        action="append",
+        default=[],
+        metavar="PREFIX",
+        help="Extract parts under PREFIX as-is (e.g. customXml/); repeatable",
+    )
+    args = parser.parse_args()
+
+    try:
+        unpack_document(
+            args.input_file,
+            args.output_dir,
+            jobs=args.jobs,
+            skip_pretty=args.skip_pretty,
+        )
+    except (ValueError, zipfile.BadZipFile) as e:
+        sys.exit(f"Error: {e}")
+
+    # For .docx files, suggest an RSID for tracked changes
+    if args.input_file.endswith(".docx"):
+        suggested_rsid = "".join(random.choices("0123456789ABCDEF", k=8))
+        print(f"Suggested RSID for edit session: {suggested_rsid}")
+
+
+def unpack_document(input_file, output_dir, jobs=None, skip_pretty=()):
+    """Extract an Office file and pretty-print its XML parts.
+
+    XML parts are formatted straight from the archive stream; parts of at
+    least PARALLEL_THRESHOLD bytes are formatted in a process pool. A line map
+    sidecar (LINE_MAP_NAME) is written next to the parts, see locate_line().
+
+    Args:
+        input_file: Path to .docx/.pptx/.xlsx file
+        output_dir: Directory to extract into (created if missing)
+        jobs: Maximum worker processes for large parts (default: CPU count)
+        skip_pretty: Part name prefixes (e.g. "customXml/") written unformatted
+
+    Returns:
+        list[Path]: Paths of the XML parts that were pretty-printed
+    """
+    input_file = Path(input_file)
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    skip_pretty = tuple(skip_pretty)
+
+    formatted = []
+    parts = {}
+    with zipfile.ZipFile(input_file) as zf, ProcessPoolExecutor(jobs) as pool:
+        pending = []
+        for info in zf.infolist():
+            target = _member_path(output_path, info.filename)
+            if info.is_dir():
+                target.mkdir(parents=True, exist_ok=True)
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+
+            if not info.filename.endswith((".xml", ".rels")):
+                with zf.open(info) as src, open(target, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                continue
+
+            content = zf.read(info)
+            if info.filename.startswith(skip_pretty):
+                target.write_bytes(content)
+                digest = hashlib.sha256(content).hexdigest()
+                parts[info.filename] = {"sha256": digest}
+                continue
+
+            if info.file_size >= PARALLEL_THRESHOLD:
+                future = pool.submit(_format_part, content)
+                pending.append((info.filename, target, future))
+            else:
+                _write_part(parts, info.filename, target, *_format_part(content))
+            formatted.append(target)
+
+        for name, target, future in pending:
+            _write_part(parts, name, target, *future.result())
+
+    source_stat = input_file.stat()
+    line_map = {
+        "source": str(input_file.resolve()),
+        "source_size": source_stat.st_size,
+        "source_mtime_ns": source_stat.st_mtime_ns,
+        "parts": parts,
+    }
+    (output_path / LINE_MAP_NAME).write_text(
+        json.dumps(line_map, separators=(",", ":")), encoding="utf-8"
+    )
+    return formatted
+
+
+def pretty_print_xml(content):
+    """Indent serialized XML two spaces per level, escaping non-ASCII characters."""
+    parser = lxml.etree.XMLParser(
+        resolve_entities=False, no_network=True, huge_tree=True
+    )
+    tree = lxml.etree.fromstring(content, parser).getroottree()
+    # pretty_print alone leaves whitespace already between elements as is, so
+    # a part that was indented in any other way would keep that layout
+    lxml.etree.indent(tree, space="  ")
+    # Same declaration as minidom, which XMLEditor relies on to detect ascii
+    declaration = '<?xml version="1.0" encoding="ascii"'
+    if tree.docinfo.standalone:
+        declaration += ' standalone="yes"'
+    body = lxml.etree.tostring(
+        tree, encoding="ascii", xml_declaration=False, pretty_print=True
+    )
+    return declaration.encode("ascii") + b"?>\n" + body
+
+
+def load_line_map(unpacked_dir):
+    """Load the line map sidecar written by unpack_document(), or None if absent."""
+    sidecar = Path(unpacked_dir) / LINE_MAP_NAME
+    if not sidecar.exists():
+        return None
+    return json.loads(sidecar.read_text(encoding="utf-8"))
+
+
+def locate_line(line_map, part_name, line_number):
+    """Find the elements that start on a pretty-printed line, without parsing the part.
+
+    Args:
+        line_map: Line map returned by load_line_map()
+        part_name: Part name inside the package (e.g. "word/document.xml")
+        line_number: 1-indexed line in the pretty-printed part
+
+    Returns:
+        list[tuple[str, int]]: (element path, byte offset in the archived part)
+            for each element whose start tag is on that line, e.g.
+            ("/w:document[1]/w:body[1]/w:p[3]", 1874)
+    """
+    entries = line_map["parts"][part_name].get("lines", [])
+    lines = [entry[0] for entry in entries]
+    start = bisect.bisect_left(lines, line_number)
+    stop = bisect.bisect_right(lines, line_number)
+    return [
+        (_element_path(entries, index), entries[index][1])
+        for index in range(start, stop)
+    ]
+
+
+def describe_line(part_path, line_number):
+    """Name the elements that start on a line of an unpacked part, for error messages.
+
+    Finds the line map sidecar in the nearest parent directory of part_path.
+
+    Args:
+        part_path: Path of a pretty-printed part inside an unpacked directory
+        line_number: 1-indexed line in that part
+
+    Returns:
+        str: Element paths on the line, comma-separated, e.g.
+            "/w:document[1]/w:body[1]/w:p[3]"; None if there is no line map,
+            the part was edited since unpacking, or no element starts there
+    """
+    part_path = Path(part_path).resolve()
+    root = next(
+        (parent for parent in part_path.parents if (parent / LINE_MAP_NAME).is_file()),
+        None,
+    )
+    if root is None:
+        return None
+    part_name = part_path.relative_to(root).as_posix()
+    try:
+        line_map = load_line_map(root)
+        part = line_map["parts"][part_name]
+    except (KeyError, ValueError):
+        return None
+    if hashlib.sha256(part_path.read_bytes()).hexdigest() != part["sha256"]:
+        return None
+    located = locate_line(line_map, part_name, line_number)
+    return ", ".join(path for path, _ in located) or None
+
+
+def _element_path(entries, index):
+    steps = []
+    while index >= 0:
+        _, _, index, step = entries[index]
+        steps.append(step)
+    return "/" + "/".join(reversed(steps))
+
+
+def _format_part(content):
+    pretty = pretty_print_xml(content)
+    return pretty, _build_line_map(content, pretty)
+
+
+def _write_part(parts, name, target, pretty, lines):
+    target.write_bytes(pretty)
+    parts[name] = {"sha256": hashlib.sha256(pretty).hexdigest(), "lines": lines}
+
+
+def _build_line_map(content, pretty):
+    """Pair every element's pretty-printed line with its offset in the original part.
+
+    Entries are [line, byte offset, parent entry index, path step] in document
+    order; the root's parent index is -1.
+    """
+    entries = []
+    stack = [(-1, {})]  # (entry index, sibling tag counts)
+
+    def start_element(name, attrs):
+        parent_index, counts = stack[-1]
+        counts[name] = counts.get(name, 0) + 1
+        step = f"{name}[{counts[name]}]"
+        entries.append([0, original.CurrentByteIndex, parent_index, step])
+        stack.append((len(entries) - 1, {}))
+
+    original = _create_expat_parser()
+    original.StartElementHandler = start_element
+    original.EndElementHandler = lambda name: stack.pop()
+    original.Parse(content, True)
+
+    lines = []
+    formatted = _create_expat_parser()
+    formatted.StartElementHandler = lambda name, attrs: lines.append(
+        formatted.CurrentLineNumber
+    )
+    formatted.Parse(pretty, True)
+
+    for entry, line in zip(entries, lines):
+        entry[0] = line
+    return entries
+
+
+def _create_expat_parser():
+    def forbid_dtd(*args):
+        raise ValueError("DTDs are not allowed in Office XML parts")
+
+    parser = xml.parsers.expat.ParserCreate()
+    parser.StartDoctypeDeclHandler = forbid_dtd
+    return parser
+
+
+def _member_path(output_path, name):
+    """Resolve an archive member name inside output_path, rejecting path traversal."""
+    parts = PurePosixPath(name).parts
+    if not parts or PurePosixPath(name).is_absolute() or ".." in parts:
+        raise ValueError(f"Unsafe path in archive: {name}")
+    return output_path.joinpath(*parts)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import contextlib
+import io
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+from pack import pack_document
+from unpack import LINE_MAP_NAME, describe_line, pretty_print_xml, unpack_document
+from validation import DOCXSchemaValidator, RedliningValidator
+
+
+# Currently this is not run automatically in CI; it's just for documentation and manual checking.
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+MINIMAL_DOCX = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/word/document.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+        "</Types>"
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="word/document.xml"/>'
+        "</Relationships>"
+    ),
+    "word/document.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<w:document xmlns:w="{W_NS}"><w:body>'
+        "<w:p><w:r><w:t>Hello</w:t></w:r></w:p>"
+        "<w:p><w:r><w:t>World</w:t></w:r></w:p>"
+        "</w:body></w:document>"
+    ),
+}
+
+
+class TestUnpackValidatePack(unittest.TestCase):
+
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_dir = Path(temp_dir)
+            original = temp_dir / "original.docx"
+            with zipfile.ZipFile(original, "w", zipfile.ZIP_DEFLATED) as zf:
+                for name, content in MINIMAL_DOCX.items():
+                    zf.writestr(name, content)
+
+            unpacked = temp_dir / "unpacked"
+            unpack_document(original, unpacked, jobs=1)
+            self.assertTrue((unpacked / LINE_MAP_NAME).exists())
+
+            # The line map sidecar must not be reported as an unreferenced part
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                for validator in (DOCXSchemaValidator, RedliningValidator):
+                    self.assertTrue(
+                        validator(unpacked, original).validate(), output.getvalue()
+                    )
+
+            packed = temp_dir / "packed.docx"
+            self.assertTrue(pack_document(unpacked, packed, validate=False))
+            with zipfile.ZipFile(packed) as zf:
+                self.assertIsNone(zf.testzip())
+                self.assertEqual(sorted(zf.namelist()), sorted(MINIMAL_DOCX))
+                # Untouched parts are copied from the source archive
+                for name, content in MINIMAL_DOCX.items():
+                    self.assertEqual(zf.read(name), content.encode())
+
+    def test_describe_line(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_dir = Path(temp_dir)
+            original = temp_dir / "original.docx"
+            with zipfile.ZipFile(original, "w") as zf:
+                for name, content in MINIMAL_DOCX.items():
+                    zf.writestr(name, content)
+            unpacked = temp_dir / "unpacked"
+            unpack_document(original, unpacked, jobs=1)
+
+            document = unpacked / "word" / "document.xml"
+            lines = document.read_text().splitlines()
+            line_number = lines.index("    <w:p>", 4) + 1
+            self.assertEqual(
+                describe_line(document, line_number), "/w:document[1]/w:body[1]/w:p[2]"
+            )
+            self.assertIsNone(describe_line(document, 1))
+
+            # Once the part is edited the map no longer applies
+            document.write_text(document.read_text().replace("World", "Earth"))
+            self.assertIsNone(describe_line(document, line_number))
+
+
+class TestPrettyPrintXml(unittest.TestCase):
+
+    def test_reindents_existing_whitespace(self):
+        content = (
+            f'<w:document xmlns:w="{W_NS}">\r\n <w:body><w:p><w:r>'
+            '<w:t xml:space="preserve"> Hello </w:t></w:r></w:p>\r\n</w:body></w:document>'
+        )
+        lines = pretty_print_xml(content.encode()).decode("ascii").splitlines()
+        self.assertEqual(
+            lines[1:],
+            [
+                f'<w:document xmlns:w="{W_NS}">',
+                "  <w:body>",
+                "    <w:p>",
+                "      <w:r>",
+                '        <w:t xml:space="preserve"> Hello </w:t>',
+                "      </w:r>",
+                "    </w:p>",
+                "  </w:body>",
+                "</w:document>",
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
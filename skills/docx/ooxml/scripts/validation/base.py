@@ -7,6 +7,10 @@ from pathlib import Path
 
 import lxml.etree
 
+# Line map sidecar written by unpack.py (must match unpack.LINE_MAP_NAME); it
+# is not part of the package and pack.py leaves it out
+LINE_MAP_NAME = ".linemap.json"
+
 
 class BaseSchemaValidator:
     """Base validator with common validation logic for document files."""
@@ -295,6 +299,7 @@ class BaseSchemaValidator:
                 file_path.is_file()
                 and file_path.name != "[Content_Types].xml"
                 and not file_path.name.endswith(".rels")
+                and file_path != self.unpacked_dir / LINE_MAP_NAME
             ):  # This file is not referenced by .rels
                 all_files.append(file_path.resolve())
 
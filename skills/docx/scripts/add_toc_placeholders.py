@@ -17,93 +17,335 @@ Usage:
 
     If --entries is not provided, generates generic placeholders.
 
+    Batch mode processes many files in a worker pool:
+    python add_toc_placeholders.py --manifest <manifest_json> [--jobs N]
+
+    manifest_json format: JSON file with array of objects:
+    [
+        {"docx": "reports/a.docx", "entries": [{"level": 1, "text": "Intro", "page": "1"}]},
+        {"docx": "reports/b.docx"}
+    ]
+
 Example:
     python add_toc_placeholders.py document.docx
     python add_toc_placeholders.py document.docx --entries '[{"level":1,"text":"Introduction","page":"1"}]'
+    python add_toc_placeholders.py --manifest manifest.json --jobs 8
 """
 
 import argparse
 import html
+import io
 import json
+import os
 import shutil
+import struct
 import sys
 import tempfile
+import time
+import xml.parsers.expat
 import zipfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+try:
+    from .style_index import load_style_index
+except ImportError:  # run as a script
+    from style_index import load_style_index
 
-def add_toc_placeholders(docx_path: str, entries: list = None) -> None:
+# Bytes read from document.xml per parser feed
+CHUNK_SIZE = 1024 * 1024
+
+# zipfile internals used to copy members without recompressing them; if a
+# Python version lacks any of them, members are recompressed instead
+_RAW_COPY_MODULE_NAMES = ('structFileHeader', 'sizeFileHeader', '_FH_FILENAME_LENGTH', '_FH_EXTRA_FIELD_LENGTH')
+_RAW_COPY_ARCHIVE_NAMES = ('fp', 'filelist', 'NameToInfo', 'start_dir', '_didModify', '_writing')
+
+
+def add_toc_placeholders(docx_path: str, entries: list = None) -> bool:
     """Add placeholder TOC entries to a DOCX file (in-place replacement).
 
+    Only word/document.xml is rewritten, streamed through an event-based scan;
+    all other members are copied without recompression. The file is left
+    untouched if no empty TOC field is found.
+
     Args:
         docx_path: Path to DOCX file (will be modified in-place)
         entries: Optional list of placeholder entries. Each entry should be a dict
                  with 'level' (1-3), 'text', and 'page' keys.
+
+    Returns:
+        True if placeholders were inserted
     """
     docx_path = Path(docx_path)
 
-    # Create temp directory for extraction
-    with tempfile.TemporaryDirectory() as temp_dir:
-        temp_path = Path(temp_dir)
-        extracted_dir = temp_path / "extracted"
-        temp_output = temp_path / "output.docx"
-
-        # Extract DOCX
-        with zipfile.ZipFile(docx_path, 'r') as zip_ref:
-            zip_ref.extractall(extracted_dir)
+    with zipfile.ZipFile(docx_path, 'r') as source:
+        names = set(source.namelist())
+        if 'word/document.xml' not in names:
+            raise ValueError("document.xml not found in the DOCX file")
 
         # Detect TOC styles from styles.xml
-        toc_style_mapping = _detect_toc_styles(extracted_dir / "word" / "styles.xml")
-        print(toc_style_mapping)
-        # Process document.xml
-        document_xml = extracted_dir / "word" / "document.xml"
-        if not document_xml.exists():
-            raise ValueError("document.xml not found in the DOCX file")
+        styles_xml = source.read('word/styles.xml') if 'word/styles.xml' in names else None
+        toc_style_mapping = _detect_toc_styles(styles_xml)
+        placeholders = _build_placeholder_paragraphs(entries, toc_style_mapping)
+
+        # Write next to the original so the final replace is atomic
+        fd, temp_name = tempfile.mkstemp(suffix='.docx', dir=docx_path.parent)
+        os.close(fd)
+        try:
+            with zipfile.ZipFile(temp_name, 'w', zipfile.ZIP_DEFLATED) as target:
+                for info in source.infolist():
+                    if info.filename == 'word/document.xml':
+                        inserted = _rewrite_document_xml(source, info, target, placeholders)
+                    else:
+                        _copy_member(source, info, target)
+            if inserted:
+                # mkstemp creates the file as 0600; keep the document's mode
+                shutil.copymode(docx_path, temp_name)
+                os.replace(temp_name, docx_path)
+        finally:
+            if os.path.exists(temp_name):
+                os.unlink(temp_name)
+    return inserted
+
+
+def add_toc_placeholders_batch(manifest: list, jobs: int = None) -> list:
+    """Add placeholder TOC entries to many DOCX files in a process pool.
+
+    Args:
+        manifest: List of dicts with 'docx' (path) and optional 'entries' keys
+        jobs: Number of worker processes (default: CPU count)
+
+    Returns:
+        List of result dicts in manifest order, each with 'docx', 'inserted',
+        'seconds' and 'error' (None on success) keys
+    """
+    with ProcessPoolExecutor(jobs) as pool:
+        return list(pool.map(_process_manifest_item, manifest, chunksize=4))
+
+
+def _process_manifest_item(item: dict) -> dict:
+    start = time.perf_counter()
+    result = {'docx': item.get('docx') if isinstance(item, dict) else None, 'inserted': False, 'error': None}
+    try:
+        # Malformed entries fail on their own instead of aborting the batch
+        if not isinstance(item, dict):
+            raise ValueError(f"manifest entry is not an object: {item!r}")
+        if 'docx' not in item:
+            raise ValueError(f"manifest entry has no 'docx' path: {item!r}")
+        result['inserted'] = add_toc_placeholders(item['docx'], item.get('entries'))
+    except Exception as e:
+        result['error'] = str(e)
+    result['seconds'] = time.perf_counter() - start
+    return result
 
-        # Read and process XML
-        content = document_xml.read_text(encoding='utf-8')
 
-        # Find TOC structure and add placeholders
-        modified_content = _insert_toc_placeholders(content, entries, toc_style_mapping)
+def _rewrite_document_xml(source, info, target, placeholders: str) -> bool:
+    """Stream document.xml from source to target, inserting TOC placeholders.
+
+    Returns:
+        True if placeholders were inserted
+    """
+    out_info = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+    out_info.compress_type = zipfile.ZIP_DEFLATED
+    out_info.external_attr = info.external_attr
+    force_zip64 = info.file_size > zipfile.ZIP64_LIMIT // 2
+    with source.open(info) as src, target.open(out_info, 'w', force_zip64=force_zip64) as dst:
+        return _TocFieldScanner(placeholders.encode('utf-8')).rewrite(src, dst)
+
+
+def _copy_member(source, info, target) -> None:
+    """Copy an archive member, without recompressing it where zipfile allows."""
+    if _can_copy_raw(source, target):
+        _copy_compressed_member(source, info, target)
+        return
+    out_info = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+    out_info.compress_type = info.compress_type
+    out_info.external_attr = info.external_attr
+    out_info.create_system = info.create_system
+    force_zip64 = info.file_size > zipfile.ZIP64_LIMIT // 2
+    with source.open(info) as src, target.open(out_info, 'w', force_zip64=force_zip64) as dst:
+        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+
+def _can_copy_raw(source, target) -> bool:
+    """Whether this zipfile still has the internals _copy_compressed_member() relies on."""
+    return (
+        all(hasattr(zipfile, name) for name in _RAW_COPY_MODULE_NAMES)
+        and hasattr(zipfile.ZipInfo, 'FileHeader')
+        and hasattr(source, 'fp')
+        and all(hasattr(target, name) for name in _RAW_COPY_ARCHIVE_NAMES)
+        and not target._writing
+    )
 
-        # Write back
-        document_xml.write_text(modified_content, encoding='utf-8')
 
-        # Repack DOCX to temp file
-        with zipfile.ZipFile(temp_output, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for file_path in extracted_dir.rglob('*'):
-                if file_path.is_file():
-                    arcname = file_path.relative_to(extracted_dir)
-                    zipf.write(file_path, arcname)
+def _copy_compressed_member(source, info, target) -> None:
+    """Copy an archive member's compressed bytes without decompressing them.
 
-        # Replace original file with modified version (use shutil.move for cross-device support)
-        docx_path.unlink()
-        shutil.move(str(temp_output), str(docx_path))
+    zipfile has no public API for this, so the local header is written the same
+    way ZipFile.write() does and the raw data is streamed after it.
+    """
+    source.fp.seek(info.header_offset)
+    header = struct.unpack(zipfile.structFileHeader, source.fp.read(zipfile.sizeFileHeader))
+    source.fp.seek(
+        header[zipfile._FH_FILENAME_LENGTH] + header[zipfile._FH_EXTRA_FIELD_LENGTH], 1
+    )
 
+    out_info = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+    out_info.compress_type = info.compress_type
+    out_info.external_attr = info.external_attr
+    out_info.create_system = info.create_system
+    # Sizes and CRC are known up front, so no trailing data descriptor is needed
+    out_info.flag_bits = info.flag_bits & ~0x08
+    out_info.CRC = info.CRC
+    out_info.compress_size = info.compress_size
+    out_info.file_size = info.file_size
+    out_info.header_offset = target.fp.tell()
+
+    target.fp.write(out_info.FileHeader())
+    remaining = info.compress_size
+    while remaining:
+        chunk = source.fp.read(min(CHUNK_SIZE, remaining))
+        if not chunk:
+            raise ValueError(f"Truncated archive member: {info.filename}")
+        target.fp.write(chunk)
+        remaining -= len(chunk)
+
+    target.filelist.append(out_info)
+    target.NameToInfo[out_info.filename] = out_info
+    target.start_dir = target.fp.tell()
+    target._didModify = True
+
+
+class _TocFieldScanner:
+    """Insert placeholder paragraphs into empty TOC fields while streaming XML.
+
+    An empty TOC is a paragraph whose last run holds the TOC field's 'separate'
+    fldChar, directly followed by a paragraph holding the field's 'end' fldChar.
+    Input bytes are copied verbatim; only bytes after a candidate insertion
+    point are held back until the following paragraph confirms or rejects it.
+    """
 
-def _detect_toc_styles(styles_xml_path: Path) -> dict:
+    def __init__(self, placeholders: bytes):
+        self.placeholders = placeholders
+        self.fields = []  # open fields: {'instr': [...], 'toc': bool}
+        self.paragraphs = []  # open paragraphs: {'separate': TOC field or None}
+        self.pending = None  # (insert offset, field) once a separate paragraph closes
+        self.candidate = None  # depth of the paragraph that may end the pending field
+        self.in_instr = False
+        self.held = bytearray()  # input not yet written, starting at offset self.emitted
+        self.emitted = 0
+        self.inserted = False
+
+    def rewrite(self, src, dst) -> bool:
+        self.dst = dst
+        self.parser = xml.parsers.expat.ParserCreate()
+        self.parser.StartDoctypeDeclHandler = self._forbid_dtd
+        self.parser.StartElementHandler = self._start
+        self.parser.EndElementHandler = self._end
+        self.parser.CharacterDataHandler = self._characters
+
+        while True:
+            chunk = src.read(CHUNK_SIZE)
+            self.held += chunk
+            self.parser.Parse(chunk, not chunk)
+            # Everything before a pending insertion point can be written out
+            self._write_until(self.emitted + len(self.held) if self.pending is None
+                              else self.pending[0])
+            if not chunk:
+                break
+        return self.inserted
+
+    def _write_until(self, offset: int):
+        count = offset - self.emitted
+        self.dst.write(self.held[:count])
+        del self.held[:count]
+        self.emitted = offset
+
+    def _forbid_dtd(self, *args):
+        raise ValueError("DTDs are not allowed in document.xml")
+
+    def _start(self, name, attrs):
+        if name == 'w:p':
+            if self.pending is not None and self.candidate is None:
+                self.candidate = len(self.paragraphs)
+            self.paragraphs.append({'separate': None})
+        elif self.pending is not None and self.candidate is None:
+            # Something other than the end paragraph follows the separate paragraph
+            self.pending = None
+        elif name == 'w:r':
+            # Content after the separate run means the TOC is already populated
+            if self.paragraphs:
+                self.paragraphs[-1]['separate'] = None
+        elif name == 'w:instrText':
+            self.in_instr = True
+        elif name == 'w:fldChar':
+            self._field_char(attrs.get('w:fldCharType'))
+
+    def _field_char(self, char_type):
+        if char_type == 'begin':
+            self.fields.append({'instr': [], 'toc': False})
+        elif char_type == 'separate' and self.fields:
+            field = self.fields[-1]
+            field['toc'] = ''.join(field['instr']).strip().startswith('TOC')
+            if field['toc'] and self.paragraphs:
+                self.paragraphs[-1]['separate'] = field
+        elif char_type == 'end' and self.fields:
+            field = self.fields.pop()
+            if (
+                self.pending is not None
+                and self.pending[1] is field
+                and self.candidate == len(self.paragraphs) - 1
+            ):
+                self._write_until(self.pending[0])
+                self.dst.write(self.placeholders)
+                self.inserted = True
+                self.pending = None
+                self.candidate = None
+
+    def _end(self, name):
+        if name == 'w:p':
+            paragraph = self.paragraphs.pop()
+            field = paragraph['separate']
+            if self.candidate is not None and self.candidate == len(self.paragraphs):
+                # Following paragraph closed without ending the field
+                self.pending = None
+                self.candidate = None
+            elif field is not None and any(f is field for f in self.fields):
+                self.pending = (self._end_tag_offset(), field)
+        elif self.pending is not None and self.candidate is None:
+            self.pending = None
+        elif name == 'w:instrText':
+            self.in_instr = False
+
+    def _characters(self, data):
+        if self.in_instr and self.fields:
+            self.fields[-1]['instr'].append(data)
+
+    def _end_tag_offset(self) -> int:
+        """Offset just past the end tag that triggered the current event."""
+        start = max(self.parser.CurrentByteIndex - self.emitted, 0)
+        return self.emitted + self.held.index(b'>', start) + 1
+
+
+def _detect_toc_styles(styles_xml: bytes = None) -> dict:
     """Detect TOC style IDs from styles.xml.
 
+    Uses the shared style index, which is memoized by content hash, so
+    documents built from the same template parse styles.xml only once.
+
     Args:
-        styles_xml_path: Path to styles.xml
+        styles_xml: Content of word/styles.xml, or None if the part is missing
 
     Returns:
         Dictionary mapping level (1, 2, 3) to style ID
     """
     default_mapping = {1: "9", 2: "11", 3: "12"}
 
-    if not styles_xml_path.exists():
+    if styles_xml is None:
         return default_mapping
 
-    content = styles_xml_path.read_text(encoding='utf-8')
-
     # Find styles with names like "toc 1", "toc 2", "toc 3"
-    import re
-    toc_styles = {}
-    for match in re.finditer(r'<w:style[^>]*w:styleId="([^"]*)"[^>]*>.*?<w:name\s+w:val="toc\s+(\d)"', content, re.DOTALL):
-        style_id = match.group(1)
-        level = int(match.group(2))
-        toc_styles[level] = style_id
+    toc_styles = load_style_index(styles_xml).toc_styles()
 
     # If we found styles, use them; otherwise use defaults
     return toc_styles if toc_styles else default_mapping
@@ -120,6 +362,23 @@ def _insert_toc_placeholders(xml_content: str, entries: list = None, toc_style_m
     Returns:
         Modified XML content with placeholders inserted
     """
+    placeholders = _build_placeholder_paragraphs(entries, toc_style_mapping)
+    src = io.BytesIO(xml_content.encode('utf-8'))
+    dst = io.BytesIO()
+    _TocFieldScanner(placeholders.encode('utf-8')).rewrite(src, dst)
+    return dst.getvalue().decode('utf-8')
+
+
+def _build_placeholder_paragraphs(entries: list = None, toc_style_mapping: dict = None) -> str:
+    """Build the placeholder TOC paragraphs inserted between 'separate' and 'end'.
+
+    Args:
+        entries: Optional list of placeholder entries
+        toc_style_mapping: Dictionary mapping level to style ID
+
+    Returns:
+        XML for the placeholder paragraphs
+    """
     # Generate default placeholder entries if none provided
     if entries is None:
         entries = [
@@ -133,39 +392,26 @@ def _insert_toc_placeholders(xml_content: str, entries: list = None, toc_style_m
     if toc_style_mapping is None:
         toc_style_mapping = {1: "9", 2: "11", 3: "12"}
 
-    # Find the TOC structure: w:p with w:fldChar separate, followed by w:p with w:fldChar end
-    # Pattern: <w:p><w:r>...<w:fldChar w:fldCharType="separate"/></w:r></w:p><w:p><w:r><w:fldChar w:fldCharType="end"/>
-    separate_end_pattern = (
-        r'(<w:p[^>]*><w:r[^>]*>.*?<w:fldChar[^>]*w:fldCharType="separate"[^>]*/></w:r></w:p>)'
-        r'(<w:p[^>]*><w:r[^>]*>.*?<w:fldChar[^>]*w:fldCharType="end"[^>]*/></w:r></w:p>)'
-    )
-
-    import re
+    # Indentation values in twips (1 inch = 1440 twips)
+    # Level 1: 0, Level 2: 0.25" (360), Level 3: 0.5" (720), Level 4+: 0.75" (1080)
+    indent_mapping = {1: 0, 2: 360, 3: 720, 4: 1080, 5: 1440, 6: 1800}
 
-    def replace_with_placeholders(match):
-        separate_para = match.group(1)
-        end_para = match.group(2)
+    # Generate placeholder paragraphs matching Word's TOC format
+    placeholder_paragraphs = []
+    for entry in entries:
+        level = entry.get('level', 1)
+        text = html.escape(entry.get('text', ''))
+        page = entry.get('page', '1')
 
-        # Indentation values in twips (1 inch = 1440 twips)
-        # Level 1: 0, Level 2: 0.25" (360), Level 3: 0.5" (720), Level 4+: 0.75" (1080)
-        indent_mapping = {1: 0, 2: 360, 3: 720, 4: 1080, 5: 1440, 6: 1800}
+        # Get style ID for this level
+        toc_style = toc_style_mapping.get(level, toc_style_mapping.get(1, "9"))
 
-        # Generate placeholder paragraphs matching Word's TOC format
-        placeholder_paragraphs = []
-        for entry in entries:
-            level = entry.get('level', 1)
-            text = html.escape(entry.get('text', ''))
-            page = entry.get('page', '1')
+        # Get indentation for this level
+        indent = indent_mapping.get(level, 0)
+        indent_attr = f'<w:ind w:left="{indent}"/>' if indent > 0 else ''
 
-            # Get style ID for this level
-            toc_style = toc_style_mapping.get(level, toc_style_mapping.get(1, "9"))
-
-            # Get indentation for this level
-            indent = indent_mapping.get(level, 0)
-            indent_attr = f'<w:ind w:left="{indent}"/>' if indent > 0 else ''
-
-            # Use w:tab element (not w:tabStop) like Word does
-            placeholder_para = f'''<w:p>
+        # Use w:tab element (not w:tabStop) like Word does
+        placeholder_para = f'''<w:p>
   <w:pPr>
     <w:pStyle w:val="{toc_style}"/>
     {indent_attr}
@@ -175,29 +421,38 @@ def _insert_toc_placeholders(xml_content: str, entries: list = None, toc_style_m
   <w:r><w:tab/></w:r>
   <w:r><w:t>{page}</w:t></w:r>
 </w:p>'''
-            placeholder_paragraphs.append(placeholder_para)
-
-        # Join with the separate paragraph at start and end paragraph at end
-        return separate_para + '\n'.join(placeholder_paragraphs) + end_para
-
-    # Replace the pattern
-    modified_content = re.sub(separate_end_pattern, replace_with_placeholders, xml_content, flags=re.DOTALL)
+        placeholder_paragraphs.append(placeholder_para)
 
-    return modified_content
+    return '\n'.join(placeholder_paragraphs)
 
 
 def main():
     parser = argparse.ArgumentParser(
         description='Add placeholder entries to Table of Contents in a DOCX file (in-place)'
     )
-    parser.add_argument('docx_file', help='DOCX file to modify (will be replaced)')
+    parser.add_argument('docx_file', nargs='?', help='DOCX file to modify (will be replaced)')
     parser.add_argument(
         '--entries',
         help='JSON string with placeholder entries: [{"level":1,"text":"Chapter 1","page":"1"}]'
     )
+    parser.add_argument(
+        '--manifest',
+        help='JSON file listing {"docx": path, "entries": [...]} objects to process in batch'
+    )
+    parser.add_argument(
+        '--jobs', type=int, default=None, help='Worker processes for --manifest (default: CPU count)'
+    )
 
     args = parser.parse_args()
 
+    if args.manifest:
+        if args.docx_file or args.entries:
+            parser.error('--manifest cannot be combined with docx_file or --entries')
+        _run_batch(args.manifest, args.jobs)
+        return
+    if not args.docx_file:
+        parser.error('docx_file or --manifest is required')
+
     # Parse entries if provided
     entries = None
     if args.entries:
@@ -209,11 +464,38 @@ def main():
 
     # Add placeholders
     try:
-        add_toc_placeholders(args.docx_file, entries)
-        print(f"Successfully added TOC placeholders to {args.docx_file}")
+        inserted = add_toc_placeholders(args.docx_file, entries)
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
+    if inserted:
+        print(f"Successfully added TOC placeholders to {args.docx_file}")
+    else:
+        print(f"No empty TOC field found in {args.docx_file}; file left unchanged")
+
+
+def _run_batch(manifest_path: str, jobs: int = None) -> None:
+    try:
+        manifest = json.loads(Path(manifest_path).read_text(encoding='utf-8'))
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Error reading manifest: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    start = time.perf_counter()
+    results = add_toc_placeholders_batch(manifest, jobs=jobs)
+    elapsed = time.perf_counter() - start
+
+    for result in results:
+        if result['error']:
+            status = f"ERROR: {result['error']}"
+        else:
+            status = 'added' if result['inserted'] else 'no empty TOC'
+        print(f"{result['seconds'] * 1000:8.1f} ms  {result['docx']}  ({status})")
+
+    failed = sum(1 for result in results if result['error'])
+    print(f"Processed {len(results)} files in {elapsed:.2f}s ({failed} failed)")
+    if failed:
+        sys.exit(1)
 
 
 if __name__ == '__main__':
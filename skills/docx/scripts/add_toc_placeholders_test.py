@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+from . import add_toc_placeholders as toc
+
+
+# Currently this is not run automatically in CI; it's just for documentation and manual checking.
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+# An empty TOC field: 'separate' ends the first paragraph, 'end' is in the next one
+DOCUMENT_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    f'<w:document xmlns:w="{W_NS}"><w:body>'
+    '<w:p><w:r><w:fldChar w:fldCharType="begin"/></w:r>'
+    '<w:r><w:instrText xml:space="preserve"> TOC \\o "1-3" \\h \\z \\u </w:instrText></w:r>'
+    '<w:r><w:fldChar w:fldCharType="separate"/></w:r></w:p>'
+    '<w:p><w:r><w:fldChar w:fldCharType="end"/></w:r></w:p>'
+    '<w:p><w:r><w:t>Body</w:t></w:r></w:p>'
+    '</w:body></w:document>'
+)
+
+OTHER_MEMBERS = {
+    "[Content_Types].xml": ('<?xml version="1.0"?><Types/>', zipfile.ZIP_DEFLATED),
+    "word/media/image1.png": (b"\x89PNG" + bytes(range(256)) * 64, zipfile.ZIP_STORED),
+    "docProps/core.xml": ("<coreProperties/>" * 500, zipfile.ZIP_DEFLATED),
+}
+
+
+def write_docx(path):
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("word/document.xml", DOCUMENT_XML, zipfile.ZIP_DEFLATED)
+        for name, (content, compress_type) in OTHER_MEMBERS.items():
+            zf.writestr(name, content, compress_type)
+
+
+class TestAddTocPlaceholders(unittest.TestCase):
+
+    def assert_round_trip(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "doc.docx")
+            write_docx(path)
+            self.assertTrue(toc.add_toc_placeholders(path, [{"level": 1, "text": "Intro", "page": "1"}]))
+
+            with zipfile.ZipFile(path) as zf:
+                self.assertIsNone(zf.testzip())
+                document = zf.read("word/document.xml").decode("utf-8")
+                self.assertIn("<w:t>Intro</w:t>", document)
+                self.assertLess(document.index("Intro"), document.index('w:fldCharType="end"'))
+                for name, (content, compress_type) in OTHER_MEMBERS.items():
+                    if isinstance(content, str):
+                        content = content.encode("utf-8")
+                    self.assertEqual(zf.read(name), content)
+                    self.assertEqual(zf.getinfo(name).compress_type, compress_type)
+
+    def test_keeps_file_mode(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "doc.docx")
+            write_docx(path)
+            os.chmod(path, 0o644)
+            self.assertTrue(toc.add_toc_placeholders(path))
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o644)
+
+    def test_round_trip_with_raw_copy(self):
+        with zipfile.ZipFile(tempfile.SpooledTemporaryFile(), "w") as target:
+            self.assertTrue(toc._can_copy_raw(target, target))
+        self.assert_round_trip()
+
+    def test_round_trip_without_raw_copy(self):
+        # As on a Python version whose zipfile internals changed
+        with mock.patch.object(toc, "_can_copy_raw", return_value=False), \
+                mock.patch.object(toc, "_copy_compressed_member", side_effect=AssertionError):
+            self.assert_round_trip()
+
+
+class TestAddTocPlaceholdersBatch(unittest.TestCase):
+
+    def test_malformed_entries_fail_alone(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "doc.docx")
+            write_docx(path)
+            manifest = [{"entries": []}, "doc.docx", {"docx": path}, {"docx": os.path.join(temp_dir, "missing.docx")}]
+            results = toc.add_toc_placeholders_batch(manifest, jobs=1)
+
+        self.assertEqual([r["docx"] for r in results], [None, None, path, os.path.join(temp_dir, "missing.docx")])
+        self.assertIn("no 'docx' path", results[0]["error"])
+        self.assertIn("not an object", results[1]["error"])
+        self.assertIsNone(results[2]["error"])
+        self.assertTrue(results[2]["inserted"])
+        self.assertIsNotNone(results[3]["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark automatic attribute injection when inserting large fragments.
+
+Inserts a fragment of paragraphs containing plain, inserted and deleted runs
+into an otherwise empty document.xml and reports the time spent in
+DocxXMLEditor.append_to (parsing the fragment plus attribute injection).
+
+Usage (from skills/docx):
+    python -m scripts.benchmark_inject_attributes [--runs 10000] [--repeat 3]
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from .document import DocxXMLEditor
+
+DOCUMENT_XML = """<?xml version="1.0" encoding="utf-8"?>
+<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">
+  <w:body/>
+</w:document>
+"""
+
+
+def build_fragment(runs):
+    """Build paragraphs totalling `runs` runs, every third one tracked."""
+    paragraphs = []
+    for start in range(0, runs, 10):
+        parts = []
+        for i in range(start, min(start + 10, runs)):
+            if i % 3 == 1:
+                parts.append(f"<w:ins><w:r><w:t> added {i}</w:t></w:r></w:ins>")
+            elif i % 3 == 2:
+                parts.append(
+                    f"<w:del><w:r><w:delText>removed {i}</w:delText></w:r></w:del>"
+                )
+            else:
+                parts.append(f"<w:r><w:t>run {i}</w:t></w:r>")
+        paragraphs.append(f"<w:p>{''.join(parts)}</w:p>")
+    return "".join(paragraphs)
+
+
+def run(runs, repeat):
+    fragment = build_fragment(runs)
+    timings = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        xml_path = Path(temp_dir) / "document.xml"
+        for _ in range(repeat):
+            xml_path.write_text(DOCUMENT_XML, encoding="utf-8")
+            editor = DocxXMLEditor(xml_path, rsid="00AB12CD")
+            body = editor.get_node(tag="w:body")
+            start = time.perf_counter()
+            editor.append_to(body, fragment)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10_000, help="Runs in fragment")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions")
+    args = parser.parse_args()
+
+    timings = run(args.runs, args.repeat)
+    print(f"Inserted {args.runs} runs {args.repeat} times")
+    print(f"  best: {min(timings) * 1000:.1f} ms")
+    print(f"  mean: {sum(timings) / len(timings) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -24,6 +24,12 @@ Usage:
 
     # Save
     doc.save()
+
+    # Bound DOM memory in long-running workers and clean up deterministically
+    with Document('workspace/unpacked', memory_budget=256 * 1024 * 1024) as doc:
+        ...
+        doc.save()
+        print(doc.memory_stats())
 """
 
 import html
@@ -38,7 +44,7 @@ from ooxml.scripts.pack import pack_document
 from ooxml.scripts.validation.docx import DOCXSchemaValidator
 from ooxml.scripts.validation.redlining import RedliningValidator
 
-from .utilities import XMLEditor
+from .utilities import EditorCache, XMLEditor
 
 # Path to template files
 TEMPLATE_DIR = Path(__file__).parent / "templates"
@@ -155,19 +161,29 @@ class DocxXMLEditor(XMLEditor):
                 self._ensure_w14_namespace()
                 elem.setAttribute("w14:textId", _generate_hex_id())
 
+        # Runs found inside a w:del during traversal
+        deleted_runs = set()
+
         def add_rsid_to_r(elem):
             # Use w:rsidDel for <w:r> inside <w:del>, otherwise w:rsidR
-            if is_inside_deletion(elem):
+            if elem in deleted_runs:
                 if not elem.hasAttribute("w:rsidDel"):
                     elem.setAttribute("w:rsidDel", self.rsid)
             else:
                 if not elem.hasAttribute("w:rsidR"):
                     elem.setAttribute("w:rsidR", self.rsid)
 
+        # Next free change ID, found with one scan on first use
+        next_change_id = None
+
         def add_tracked_change_attrs(elem):
+            nonlocal next_change_id
             # Auto-assign w:id if not present
             if not elem.hasAttribute("w:id"):
-                elem.setAttribute("w:id", str(self._get_next_change_id()))
+                if next_change_id is None:
+                    next_change_id = self._get_next_change_id()
+                elem.setAttribute("w:id", str(next_change_id))
+                next_change_id += 1
             if not elem.hasAttribute("w:author"):
                 elem.setAttribute("w:author", self.author)
             if not elem.hasAttribute("w:date"):
@@ -204,38 +220,50 @@ class DocxXMLEditor(XMLEditor):
                     if not elem.hasAttribute("xml:space"):
                         elem.setAttribute("xml:space", "preserve")
 
+        # Descendants are processed one tag at a time in this order, so IDs and
+        # namespace declarations are added in a stable order
+        handlers = {
+            "w:p": add_rsid_to_p,
+            "w:r": add_rsid_to_r,
+            "w:t": add_xml_space_to_t,
+            "w:ins": add_tracked_change_attrs,
+            "w:del": add_tracked_change_attrs,
+            "w:comment": add_comment_attrs,
+            "w16cex:commentExtensible": add_comment_extensible_date,
+        }
+
         for node in nodes:
             if node.nodeType != node.ELEMENT_NODE:
                 continue
+            node_deleted = is_inside_deletion(node)
 
             # Handle the node itself
-            if node.tagName == "w:p":
-                add_rsid_to_p(node)
-            elif node.tagName == "w:r":
-                add_rsid_to_r(node)
-            elif node.tagName == "w:t":
-                add_xml_space_to_t(node)
-            elif node.tagName in ("w:ins", "w:del"):
-                add_tracked_change_attrs(node)
-            elif node.tagName == "w:comment":
-                add_comment_attrs(node)
-            elif node.tagName == "w16cex:commentExtensible":
-                add_comment_extensible_date(node)
-
-            # Process descendants (getElementsByTagName doesn't return the element itself)
-            for elem in node.getElementsByTagName("w:p"):
-                add_rsid_to_p(elem)
-            for elem in node.getElementsByTagName("w:r"):
-                add_rsid_to_r(elem)
-            for elem in node.getElementsByTagName("w:t"):
-                add_xml_space_to_t(elem)
-            for tag in ("w:ins", "w:del"):
-                for elem in node.getElementsByTagName(tag):
-                    add_tracked_change_attrs(elem)
-            for elem in node.getElementsByTagName("w:comment"):
-                add_comment_attrs(elem)
-            for elem in node.getElementsByTagName("w16cex:commentExtensible"):
-                add_comment_extensible_date(elem)
+            if node.tagName == "w:r" and node_deleted:
+                deleted_runs.add(node)
+            if node.tagName in handlers:
+                handlers[node.tagName](node)
+
+            # Collect descendants in document order with a single depth-first
+            # walk, carrying whether each element is inside a w:del
+            found = {tag: [] for tag in handlers}
+            stack = [(node, node_deleted)]
+            while stack:
+                elem, deleted = stack.pop()
+                if elem is not node and elem.tagName in found:
+                    found[elem.tagName].append(elem)
+                    if elem.tagName == "w:r" and deleted:
+                        deleted_runs.add(elem)
+                deleted = deleted or elem.tagName == "w:del"
+                stack.extend(
+                    (child, deleted)
+                    for child in reversed(elem.childNodes)
+                    if child.nodeType == child.ELEMENT_NODE
+                )
+
+            # Process descendants in document order
+            for tag, handler in handlers.items():
+                for elem in found[tag]:
+                    handler(elem)
 
     def replace_node(self, elem, new_content):
         """Replace node with automatic attribute injection."""
@@ -619,6 +647,7 @@ class Document:
         track_revisions=False,
         author="GLM",
         initials="C",
+        memory_budget=None,
     ):
         """
         Initialize with path to unpacked Word document directory.
@@ -630,6 +659,10 @@ class Document:
             track_revisions: If True, enables track revisions in settings.xml (default: False)
             author: Default author name for comments (default: "GLM")
             initials: Default author initials for comments (default: "C")
+            memory_budget: Estimated bytes of parsed XML to keep loaded (default: unlimited).
+                Least recently used parts other than word/document.xml are unloaded
+                beyond it, after writing any changes to the working copy. Don't hold
+                nodes of other parts across accesses when setting a budget.
         """
         self.original_path = Path(unpacked_dir)
 
@@ -656,7 +689,8 @@ class Document:
         self.initials = initials
 
         # Cache for lazy-loaded editors
-        self._editors = {}
+        self._editors = EditorCache(self._create_editor, memory_budget=memory_budget)
+        self._editors.pin("word/document.xml")
 
         # Comment file paths
         self.comments_path = self.word_path / "comments.xml"
@@ -700,15 +734,36 @@ class Document:
             # Get node from comments.xml
             comment = doc["word/comments.xml"].get_node(tag="w:comment", attrs={"w:id": "0"})
         """
-        if xml_path not in self._editors:
-            file_path = self.unpacked_path / xml_path
-            if not file_path.exists():
-                raise ValueError(f"XML file not found: {xml_path}")
-            # Use DocxXMLEditor with RSID, author, and initials for all editors
-            self._editors[xml_path] = DocxXMLEditor(
-                file_path, rsid=self.rsid, author=self.author, initials=self.initials
-            )
-        return self._editors[xml_path]
+        file_path = self.unpacked_path / xml_path
+        if xml_path not in self._editors and not file_path.exists():
+            raise ValueError(f"XML file not found: {xml_path}")
+        return self._editors.get(xml_path, file_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self) -> None:
+        """Discard loaded editors and remove the temporary working directory.
+
+        Unsaved changes are lost. Called automatically when used as a context manager.
+        """
+        if hasattr(self, "_editors"):
+            self._editors.clear()
+        if hasattr(self, "temp_dir") and Path(self.temp_dir).exists():
+            shutil.rmtree(self.temp_dir)
+
+    def memory_stats(self) -> dict:
+        """
+        Report editor cache counters for monitoring.
+
+        Returns:
+            dict: loaded_editors, estimated_memory and memory_budget (bytes), plus
+            cumulative loads, evictions and spills (evictions that wrote changes)
+        """
+        return self._editors.stats()
 
     def add_comment(self, start, end, text: str) -> int:
         """
@@ -832,8 +887,7 @@ class Document:
 
     def __del__(self):
         """Clean up temporary directory on deletion."""
-        if hasattr(self, "temp_dir") and Path(self.temp_dir).exists():
-            shutil.rmtree(self.temp_dir)
+        self.close()
 
     def validate(self) -> None:
         """
@@ -885,6 +939,12 @@ class Document:
 
     # ==================== Private: Initialization ====================
 
+    def _create_editor(self, file_path):
+        # Use DocxXMLEditor with RSID, author, and initials for all editors
+        return DocxXMLEditor(
+            file_path, rsid=self.rsid, author=self.author, initials=self.initials
+        )
+
     def _get_next_comment_id(self):
         """Get the next available comment ID."""
         if not self.comments_path.exists():
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Index of the styles defined in a Word document's styles.xml.
+
+The index is built with a single event-based (expat) pass and memoized by the
+SHA-256 of the styles.xml content, so documents generated from one template
+share a single index.
+
+Usage:
+    from skills.docx.scripts.style_index import load_style_index
+
+    index = load_style_index(Path("unpacked/word/styles.xml").read_bytes())
+    index.name("Heading1")             # "heading 1"
+    index.based_on_chain("Heading1")   # ["Heading1", "Normal"]
+    index.toc_level("TOC2")            # 2
+    index.outline_level("Heading2")    # 2, also for styles based on it
+    index.toc_styles()                 # {1: "TOC1", 2: "TOC2", 3: "TOC3"}
+"""
+
+import hashlib
+import re
+import xml.parsers.expat
+from collections import OrderedDict
+
+WORD_NAMESPACE = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+# Built-in TOC styles are named "toc 1" to "toc 9"
+TOC_NAME_PATTERN = re.compile(r"toc (\d)", re.IGNORECASE)
+
+# Built-in heading styles are named "heading 1" to "heading 9"
+HEADING_NAME_PATTERN = re.compile(r"heading (\d)", re.IGNORECASE)
+
+# Number of distinct styles.xml contents kept by load_style_index
+CACHE_SIZE = 32
+
+_index_cache = OrderedDict()
+
+
+class StyleIndex:
+    """Lookup tables for the styles in one styles.xml.
+
+    Attributes:
+        styles: Dict mapping styleId to a dict with 'name', 'type', 'based_on',
+                'default' and 'outline_level' keys ('name', 'based_on' and
+                'outline_level', the 0-based w:outlineLvl, may be None)
+    """
+
+    def __init__(self, styles: dict):
+        self.styles = styles
+        self._ids_by_name = {}
+        for style_id, style in styles.items():
+            if style["name"] is not None:
+                self._ids_by_name.setdefault(style["name"].lower(), style_id)
+
+    @classmethod
+    def from_bytes(cls, content: bytes) -> "StyleIndex":
+        """Build an index from styles.xml content."""
+        styles = {}
+        current = None
+        separator = " "
+        style_tag = f"{WORD_NAMESPACE}{separator}style"
+        name_tag = f"{WORD_NAMESPACE}{separator}name"
+        based_on_tag = f"{WORD_NAMESPACE}{separator}basedOn"
+        outline_level_tag = f"{WORD_NAMESPACE}{separator}outlineLvl"
+
+        def attr(attrs, local_name):
+            return attrs.get(f"{WORD_NAMESPACE}{separator}{local_name}")
+
+        def start_element(name, attrs):
+            nonlocal current
+            if name == style_tag:
+                current = {
+                    "name": None,
+                    "type": attr(attrs, "type"),
+                    "based_on": None,
+                    "default": attr(attrs, "default") in ("1", "true", "on"),
+                    "outline_level": None,
+                }
+                style_id = attr(attrs, "styleId")
+                if style_id is not None:
+                    styles[style_id] = current
+            elif current is not None and name == name_tag:
+                current["name"] = attr(attrs, "val")
+            elif current is not None and name == based_on_tag:
+                current["based_on"] = attr(attrs, "val")
+            elif current is not None and name == outline_level_tag:
+                value = attr(attrs, "val")
+                current["outline_level"] = int(value) if value and value.isdigit() else None
+
+        def end_element(name):
+            nonlocal current
+            if name == style_tag:
+                current = None
+
+        def forbid_dtd(*args):
+            raise ValueError("DTDs are not allowed in styles.xml")
+
+        parser = xml.parsers.expat.ParserCreate(namespace_separator=separator)
+        parser.StartDoctypeDeclHandler = forbid_dtd
+        parser.StartElementHandler = start_element
+        parser.EndElementHandler = end_element
+        parser.Parse(content, True)
+        return cls(styles)
+
+    def __contains__(self, style_id):
+        return style_id in self.styles
+
+    def __len__(self):
+        return len(self.styles)
+
+    def name(self, style_id: str):
+        """Return the style's display name, or None if unknown."""
+        style = self.styles.get(style_id)
+        return style["name"] if style else None
+
+    def find_by_name(self, name: str):
+        """Return the styleId of the first style with this name (case-insensitive)."""
+        return self._ids_by_name.get(name.lower())
+
+    def based_on_chain(self, style_id: str) -> list:
+        """Return style_id followed by its basedOn ancestors, nearest first.
+
+        Stops at undefined styles and at cycles.
+        """
+        chain = []
+        while style_id in self.styles and style_id not in chain:
+            chain.append(style_id)
+            style_id = self.styles[style_id]["based_on"]
+        return chain
+
+    def toc_level(self, style_id: str):
+        """Return the TOC level (1-9) of a "toc N" style, or None.
+
+        Styles without a "toc N" name inherit the level of the nearest basedOn
+        ancestor that has one.
+        """
+        for ancestor in self.based_on_chain(style_id):
+            level = self._name_level(ancestor, TOC_NAME_PATTERN)
+            if level is not None:
+                return level
+        return None
+
+    def outline_level(self, style_id: str):
+        """Return the level (1-9) at which paragraphs of a style appear in a TOC, or None.
+
+        Taken from the nearest style in the basedOn chain that sets
+        w:outlineLvl or is named "heading N"; outline level 9 is body text.
+        """
+        for ancestor in self.based_on_chain(style_id):
+            outline_level = self.styles[ancestor]["outline_level"]
+            if outline_level is not None:
+                return outline_level + 1 if outline_level < 9 else None
+            level = self._name_level(ancestor, HEADING_NAME_PATTERN)
+            if level is not None:
+                return level
+        return None
+
+    def toc_styles(self) -> dict:
+        """Return a dict mapping TOC level to styleId.
+
+        Styles named "toc N" take precedence over styles based on them.
+        """
+        levels = {}
+        for style_id in self.styles:
+            level = self.toc_level(style_id)
+            if level is not None and (
+                level not in levels or self._name_level(style_id, TOC_NAME_PATTERN) == level
+            ):
+                levels[level] = style_id
+        return levels
+
+    def _name_level(self, style_id, pattern):
+        name = self.name(style_id)
+        match = pattern.fullmatch(name.strip()) if name else None
+        return int(match.group(1)) if match else None
+
+
+def load_style_index(content: bytes) -> StyleIndex:
+    """Return the StyleIndex for styles.xml content, reusing one built earlier."""
+    digest = hashlib.sha256(content).digest()
+    if digest in _index_cache:
+        _index_cache.move_to_end(digest)
+        return _index_cache[digest]
+
+    index = StyleIndex.from_bytes(content)
+    _index_cache[digest] = index
+    if len(_index_cache) > CACHE_SIZE:
+        _index_cache.popitem(last=False)
+    return index
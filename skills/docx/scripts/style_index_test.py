@@ -0,0 +1,63 @@
+import unittest
+
+from .style_index import StyleIndex
+
+
+# Currently this is not run automatically in CI; it's just for documentation and manual checking.
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+
+def style(style_id, name, based_on=None, outline_level=None):
+    xml = f'<w:style w:type="paragraph" w:styleId="{style_id}"><w:name w:val="{name}"/>'
+    if based_on:
+        xml += f'<w:basedOn w:val="{based_on}"/>'
+    if outline_level is not None:
+        xml += f'<w:pPr><w:outlineLvl w:val="{outline_level}"/></w:pPr>'
+    return xml + "</w:style>"
+
+
+STYLES_XML = (
+    f'<w:styles xmlns:w="{W_NS}">'
+    + style("Normal", "Normal")
+    + style("Heading1", "heading 1", "Normal", 0)
+    + style("Heading2", "heading 2", "Normal")
+    + style("Custom2", "Custom Heading", "Heading2")
+    + style("Custom3", "Deep Custom", "Custom2", 2)
+    + style("BodyHeading", "Body Heading", "Heading1", 9)
+    + style("MyToc1", "My Contents", "TOC1")
+    + style("TOC1", "toc 1", "Normal")
+    + style("TOC2", "toc 2", "Normal")
+    + style("LoopA", "Loop A", "LoopB")
+    + style("LoopB", "Loop B", "LoopA")
+    + "</w:styles>"
+)
+
+
+class TestStyleIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = StyleIndex.from_bytes(STYLES_XML.encode())
+
+    def test_outline_level_follows_based_on(self):
+        self.assertEqual(self.index.outline_level("Heading1"), 1)
+        self.assertEqual(self.index.outline_level("Heading2"), 2)
+        self.assertEqual(self.index.outline_level("Custom2"), 2)
+        self.assertEqual(self.index.outline_level("Custom3"), 3)
+        self.assertIsNone(self.index.outline_level("BodyHeading"))
+        self.assertIsNone(self.index.outline_level("Normal"))
+        self.assertIsNone(self.index.outline_level("LoopA"))
+        self.assertIsNone(self.index.outline_level("Missing"))
+
+    def test_toc_level_follows_based_on(self):
+        self.assertEqual(self.index.toc_level("TOC2"), 2)
+        self.assertEqual(self.index.toc_level("MyToc1"), 1)
+        self.assertIsNone(self.index.toc_level("Heading2"))
+        self.assertIsNone(self.index.toc_level("LoopB"))
+
+    def test_toc_styles_prefer_built_in_names(self):
+        self.assertEqual(self.index.toc_styles(), {1: "TOC1", 2: "TOC2"})
+
+
+if __name__ == "__main__":
+    unittest.main()
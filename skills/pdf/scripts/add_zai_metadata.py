@@ -9,23 +9,32 @@ It can process single files or batch process multiple PDFs.
 import os
 import sys
 import argparse
-from pypdf import PdfReader, PdfWriter
 
+from zai_metadata import ZAI_FIELDS, stamp_files, stamp_pdf
 
-def add_zai_metadata(input_pdf_path, output_pdf_path=None, custom_title=None, verbose=True):
+
+def add_zai_metadata(input_pdf_path, output_pdf_path=None, custom_title=None, verbose=True, force=False,
+                     producer=None, default_subject=None, keep_title=True):
     """
     Add Z.ai branding metadata to a PDF document.
 
+    Files that already carry the metadata are not rewritten; see zai_metadata.py.
+
     Args:
         input_pdf_path: Path to input PDF
         output_pdf_path: Path to output PDF (default: overwrites input)
         custom_title: Custom title to use (default: preserves original or uses filename)
         verbose: Print status messages (default: True)
+        force: Write the metadata even if the file already has it (default: False)
+        producer: Producer to set (default: http://z.ai)
+        default_subject: Subject to set if the file has none (default: leave it)
+        keep_title: Keep an existing title when no custom title is given;
+                    otherwise the filename is used (default: True)
 
     Sets:
         - Author: Z.ai
         - Creator: Z.ai
-        - Producer: http://z.ai
+        - Producer: http://z.ai, or `producer`
         - Title: Custom title, original title, or filename (in that priority)
 
     Returns:
@@ -36,62 +45,48 @@ def add_zai_metadata(input_pdf_path, output_pdf_path=None, custom_title=None, ve
         print(f"Error: Input file not found: {input_pdf_path}", file=sys.stderr)
         sys.exit(1)
 
-    # Read the PDF
-    try:
-        reader = PdfReader(input_pdf_path)
-    except Exception as e:
-        print(f"Error: Cannot open PDF: {e}", file=sys.stderr)
-        sys.exit(1)
-
-    writer = PdfWriter()
-
-    # Copy all pages
-    for page in reader.pages:
-        writer.add_page(page)
-
-    # Determine title
-    if custom_title:
-        title = custom_title
-    else:
-        original_meta = reader.metadata
-        if original_meta and original_meta.title and original_meta.title not in ['(anonymous)', 'unspecified', None]:
-            title = original_meta.title
-        else:
-            # Use filename without extension as title
-            title = os.path.splitext(os.path.basename(input_pdf_path))[0]
-
-    # Add Z.ai metadata
-    writer.add_metadata({
-        '/Title': title,
-        '/Author': 'Z.ai',
-        '/Creator': 'Z.ai',
-        '/Producer': 'http://z.ai',
-    })
-
-    # Write output
     if output_pdf_path is None:
         output_pdf_path = input_pdf_path
 
     try:
-        with open(output_pdf_path, "wb") as output:
-            writer.write(output)
-    except Exception as e:
+        result = stamp_pdf(input_pdf_path, output_pdf_path,
+                           **_stamp_options(custom_title, force, producer, default_subject, keep_title))
+    except OSError as e:
         print(f"Error: Cannot write output file: {e}", file=sys.stderr)
         sys.exit(1)
+    except Exception as e:
+        print(f"Error: Cannot open PDF: {e}", file=sys.stderr)
+        sys.exit(1)
 
-    # Print status
     if verbose:
-        print(f"✓ Updated metadata for: {os.path.basename(input_pdf_path)}")
-        print(f"  Title: {title}")
-        print(f"  Author: Z.ai")
-        print(f"  Creator: Z.ai")
-        print(f"  Producer: http://z.ai")
-        if output_pdf_path != input_pdf_path:
-            print(f"  Output: {output_pdf_path}")
+        print_status(input_pdf_path, output_pdf_path, result)
 
     return output_pdf_path
 
 
+def _stamp_options(title, force, producer, default_subject, keep_title):
+    """stamp_pdf() keyword arguments for the command-line options."""
+    fields = dict(ZAI_FIELDS)
+    if producer:
+        fields['/Producer'] = producer
+    defaults = {'/Subject': default_subject} if default_subject else None
+    return {'title': title, 'keep_title': keep_title, 'fields': fields, 'defaults': defaults, 'force': force}
+
+
+def print_status(input_pdf_path, output_pdf_path, result):
+    """Print the metadata set on one file, given its StampResult."""
+    if result.status == 'skipped':
+        print(f"- Already stamped, skipped: {os.path.basename(input_pdf_path)}")
+    else:
+        print(f"✓ Updated metadata for: {os.path.basename(input_pdf_path)}")
+    print(f"  Title: {result.title}")
+    for key in ('/Author', '/Creator', '/Producer', '/Subject'):
+        if key in result.metadata:
+            print(f"  {key[1:]}: {result.metadata[key]}")
+    if output_pdf_path != input_pdf_path:
+        print(f"  Output: {output_pdf_path}")
+
+
 def main():
     """Command-line interface for add_zai_metadata."""
     parser = argparse.ArgumentParser(
@@ -111,6 +106,12 @@ Examples:
   # Batch process all PDFs in current directory
   %(prog)s *.pdf
 
+  # Batch process with 8 worker processes
+  %(prog)s archive/*.pdf -j 8
+
+  # Rewrite the metadata even on files that already have it
+  %(prog)s *.pdf --force
+
   # Quiet mode (no output)
   %(prog)s document.pdf -q
         """
@@ -132,6 +133,35 @@ Examples:
         help='Custom title for the PDF'
     )
 
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        help='Number of worker processes for batch processing (default: 1)'
+    )
+
+    parser.add_argument(
+        '-f', '--force',
+        action='store_true',
+        help='Write the metadata even if a file already has it'
+    )
+
+    parser.add_argument(
+        '--producer',
+        help='Producer to set (default: http://z.ai)'
+    )
+
+    parser.add_argument(
+        '--default-subject',
+        help='Subject to set on files that have none'
+    )
+
+    parser.add_argument(
+        '--filename-title',
+        action='store_true',
+        help='Without -t, title files after their filename instead of keeping an existing title'
+    )
+
     parser.add_argument(
         '-q', '--quiet',
         action='store_true',
@@ -145,27 +175,25 @@ Examples:
         print("Error: --output can only be used with a single input file", file=sys.stderr)
         sys.exit(1)
 
-    # Process each input file
-    for input_path in args.input:
-        # Determine output path
-        if len(args.input) == 1 and args.output:
-            output_path = args.output
-        else:
-            output_path = None  # Overwrite in-place
-
-        # Determine title
-        if args.title:
-            custom_title = args.title
-        else:
-            custom_title = None
-
-        # Add metadata
+    if len(args.input) == 1:
         add_zai_metadata(
-            input_path,
-            output_pdf_path=output_path,
-            custom_title=custom_title,
-            verbose=not args.quiet
+            args.input[0],
+            output_pdf_path=args.output,
+            custom_title=args.title,
+            verbose=not args.quiet,
+            force=args.force,
+            producer=args.producer,
+            default_subject=args.default_subject,
+            keep_title=not args.filename_title
         )
+        return
+
+    # Batch: overwrite each file in place
+    options = _stamp_options(args.title, args.force, args.producer, args.default_subject, not args.filename_title)
+    tasks = [(input_path, input_path, options) for input_path in args.input]
+    counts = stamp_files(tasks, jobs=args.jobs, on_result=None if args.quiet else print_status, verbose=not args.quiet)
+    if counts['failed']:
+        sys.exit(1)
 
 
 if __name__ == '__main__':
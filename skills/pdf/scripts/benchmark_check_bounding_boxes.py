@@ -0,0 +1,57 @@
+import io
+import json
+import sys
+import time
+
+from check_bounding_boxes import check_bounding_boxes_batch, get_bounding_box_messages
+
+
+# Benchmarks get_bounding_box_messages, or with --batch the NumPy
+# check_bounding_boxes_batch, on generated dense forms with no intersections,
+# so every box is checked and no early abort happens. Times include parsing
+# the JSON.
+# Usage: benchmark_check_bounding_boxes.py [--batch] [box counts, default 1000 10000 100000]
+
+
+# Builds a fields.json document with `box_count` boxes (two per field), laid out
+# as rows of label/entry pairs filling 612x792 pages.
+def build_fields_json(box_count: int) -> str:
+    fields = []
+    rows_per_page = 36
+    columns = 3
+    for i in range(box_count // 2):
+        page, slot = divmod(i, rows_per_page * columns)
+        row, column = divmod(slot, columns)
+        x = 20 + column * 195
+        y = 30 + row * 20
+        fields.append({
+            "description": f"Field {i}",
+            "page_number": page + 1,
+            "label_bounding_box": [x, y, x + 60, y + 16],
+            "entry_bounding_box": [x + 65, y, x + 185, y + 16],
+            "entry_text": {"text": "x", "font_size": 10},
+        })
+    return json.dumps({"form_fields": fields})
+
+
+def main(box_counts, batch=False):
+    print(f"{'boxes':>8} {'seconds':>9} {'us/box':>8}")
+    for box_count in box_counts:
+        fields_json = build_fields_json(box_count)
+        start = time.perf_counter()
+        if batch:
+            report = check_bounding_boxes_batch(json.loads(fields_json)["form_fields"])
+            elapsed = time.perf_counter() - start
+            assert report.ok, report
+        else:
+            messages = get_bounding_box_messages(io.StringIO(fields_json))
+            elapsed = time.perf_counter() - start
+            assert messages[-1].startswith("SUCCESS"), messages
+        print(f"{box_count:>8} {elapsed:>9.3f} {elapsed / box_count * 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    batch = "--batch" in args
+    counts = [int(arg) for arg in args if arg != "--batch"] or [1000, 10000, 100000]
+    main(counts, batch)
@@ -0,0 +1,65 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+from pypdf import PdfWriter
+
+from fill_pdf_form_with_annotations import fill_pdf_form
+
+
+# Benchmarks fill_pdf_form_with_annotations.py with and without FreeTextStylePool
+# on a generated form with many annotations sharing a few styles, and reports the
+# output size and the time taken.
+# Usage: benchmark_fill_annotations.py [pages, default 300] [fields per page, default 30]
+
+
+def build_inputs(temp_dir, pages, fields_per_page):
+    pdf_path = os.path.join(temp_dir, "blank.pdf")
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=612, height=792)
+    with open(pdf_path, "wb") as f:
+        writer.write(f)
+
+    fields = []
+    for page in range(1, pages + 1):
+        for i in range(fields_per_page):
+            y = 20 + i * 30
+            fields.append({
+                "page_number": page,
+                "description": f"Field {i}",
+                "label_bounding_box": [10, y, 90, y + 20],
+                "entry_bounding_box": [100, y, 400, y + 20],
+                "entry_text": {"text": f"Value {page}.{i}", "font_size": 10 + i % 2 * 2, "font_color": "000000" if i % 3 else "0000ff"},
+            })
+    fields_json_path = os.path.join(temp_dir, "fields.json")
+    with open(fields_json_path, "w") as f:
+        json.dump({
+            "pages": [{"page_number": p, "image_width": 773, "image_height": 1000} for p in range(1, pages + 1)],
+            "form_fields": fields,
+        }, f)
+    return pdf_path, fields_json_path
+
+
+def main(pages, fields_per_page):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path, fields_json_path = build_inputs(temp_dir, pages, fields_per_page)
+        print(f"{pages} pages, {pages * fields_per_page} annotations")
+        for label, pool_styles in (("separate", False), ("pooled", True)):
+            output_path = os.path.join(temp_dir, f"{label}.pdf")
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                fill_pdf_form(pdf_path, fields_json_path, output_path, pool_styles=pool_styles)
+            elapsed = time.perf_counter() - start
+            size = os.path.getsize(output_path)
+            print(f"  {label:>8}: {size / 1024:9.1f} KiB, {elapsed:6.2f} s")
+
+
+if __name__ == "__main__":
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    fields_per_page = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    main(pages, fields_per_page)
@@ -1,7 +1,14 @@
 from dataclasses import dataclass
 import json
+import math
+import statistics
 import sys
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 
 # Script to check that the `fields.json` file that GLM creates when analyzing PDFs
 # does not have overlapping bounding boxes. See forms.md.
@@ -14,6 +21,54 @@ class RectAndField:
     field: dict
 
 
+# Rectangles spanning more grid cells than this are kept in a separate list that
+# every query checks, so one huge (or malformed) box doesn't fill the whole grid.
+MAX_CELLS_PER_RECT = 64
+
+
+# Uniform grid over the rectangles of one page. Two rectangles with a non-empty
+# intersection always share a cell, so a query only has to test the rectangles
+# registered in the cells it covers. The cell size is the median box extent,
+# which keeps the number of candidates per query small for typical forms.
+class _PageGrid:
+    def __init__(self, indexed_rects):
+        extents = [max(abs(r[2] - r[0]), abs(r[3] - r[1])) for _, r in indexed_rects]
+        finite_extents = [e for e in extents if math.isfinite(e) and e > 0]
+        self.cell_size = statistics.median(finite_extents) if finite_extents else 1
+        self.cells = {}
+        self.oversized = []
+        for i, rect in indexed_rects:
+            cells = self._cell_range(rect)
+            if cells is None:
+                self.oversized.append(i)
+                continue
+            for cell in cells:
+                self.cells.setdefault(cell, []).append(i)
+
+    # Returns the cells covered by `rect`, or None if it spans too many of them.
+    def _cell_range(self, rect):
+        try:
+            x_lo = math.floor(min(rect[0], rect[2]) / self.cell_size)
+            x_hi = math.floor(max(rect[0], rect[2]) / self.cell_size)
+            y_lo = math.floor(min(rect[1], rect[3]) / self.cell_size)
+            y_hi = math.floor(max(rect[1], rect[3]) / self.cell_size)
+        except (OverflowError, ValueError):
+            return None
+        if (x_hi - x_lo + 1) * (y_hi - y_lo + 1) > MAX_CELLS_PER_RECT:
+            return None
+        return [(x, y) for x in range(x_lo, x_hi + 1) for y in range(y_lo, y_hi + 1)]
+
+    # Returns the indices of rectangles that may intersect `rect`.
+    def candidates(self, rect):
+        cells = self._cell_range(rect)
+        if cells is None:
+            return set(i for bucket in self.cells.values() for i in bucket).union(self.oversized)
+        found = set(self.oversized)
+        for cell in cells:
+            found.update(self.cells.get(cell, ()))
+        return found
+
+
 # Returns a list of messages that are printed to stdout for GLM to read.
 def get_bounding_box_messages(fields_json_stream) -> list[str]:
     messages = []
@@ -30,12 +85,20 @@ def get_bounding_box_messages(fields_json_stream) -> list[str]:
         rects_and_fields.append(RectAndField(f["label_bounding_box"], "label", f))
         rects_and_fields.append(RectAndField(f["entry_bounding_box"], "entry", f))
 
+    # Only rectangles on the same page can intersect, and within a page a grid
+    # index limits the pairs tested to nearby rectangles. Intersections are still
+    # reported in the same order as comparing every pair (i, j) with i < j.
+    rects_by_page = {}
+    for i, r in enumerate(rects_and_fields):
+        rects_by_page.setdefault(r.field["page_number"], []).append((i, r.rect))
+    grids = {page: _PageGrid(indexed_rects) for page, indexed_rects in rects_by_page.items()}
+
     has_error = False
     for i, ri in enumerate(rects_and_fields):
-        # This is O(N^2); we can optimize if it becomes a problem.
-        for j in range(i + 1, len(rects_and_fields)):
+        grid = grids[ri.field["page_number"]]
+        for j in sorted(j for j in grid.candidates(ri.rect) if j > i):
             rj = rects_and_fields[j]
-            if ri.field["page_number"] == rj.field["page_number"] and rects_intersect(ri.rect, rj.rect):
+            if rects_intersect(ri.rect, rj.rect):
                 has_error = True
                 if ri.field is rj.field:
                     messages.append(f"FAILURE: intersection between label and entry bounding boxes for `{ri.field['description']}` ({ri.rect}, {rj.rect})")
@@ -59,6 +122,107 @@ def get_bounding_box_messages(fields_json_stream) -> list[str]:
         messages.append("SUCCESS: All bounding boxes are valid")
     return messages
 
+
+# Upper bound on the number of rectangle pairs compared at once by the batch
+# check; the boolean masks for one block take a few bytes per pair.
+BLOCK_PAIRS = 1 << 22
+
+
+# Structured result of check_bounding_boxes_batch. Rectangle `2 * k` is the label
+# box of field `k` and rectangle `2 * k + 1` is its entry box.
+@dataclass
+class BoundingBoxReport:
+    # (K, 2) array of intersecting rectangle indices (i, j) with i < j, sorted.
+    intersections: "np.ndarray"
+    # Indices of fields whose entry box is shorter than its font size.
+    short_entries: "np.ndarray"
+    # Entry box heights and font sizes for `short_entries`.
+    entry_heights: "np.ndarray"
+    font_sizes: "np.ndarray"
+
+    @property
+    def ok(self) -> bool:
+        return len(self.intersections) == 0 and len(self.short_entries) == 0
+
+
+# NumPy batch version of get_bounding_box_messages for callers that validate many
+# candidate layouts: `form_fields` is the "form_fields" list of fields.json, and
+# all findings are returned (there is no 20-message cap). Requires numpy.
+def check_bounding_boxes_batch(form_fields, block_pairs: int = BLOCK_PAIRS) -> BoundingBoxReport:
+    if np is None:
+        raise ImportError("check_bounding_boxes_batch requires numpy (pip install numpy)")
+    rects = np.array(
+        [[f["label_bounding_box"], f["entry_bounding_box"]] for f in form_fields],
+        dtype=float,
+    ).reshape(-1, 4)
+    page_codes = {}
+    pages = np.array([page_codes.setdefault(f["page_number"], len(page_codes)) for f in form_fields], dtype=np.intp)
+    font_sizes = np.array(
+        [f["entry_text"].get("font_size", 14) if "entry_text" in f else np.nan for f in form_fields],
+        dtype=float,
+    )
+    return check_rect_arrays(rects, pages, font_sizes, block_pairs)
+
+
+# Array form of check_bounding_boxes_batch. `rects` is a (2N, 4) array of label
+# and entry boxes (label first), `pages` holds N page numbers and `font_sizes` N
+# entry font sizes, NaN for fields without entry text.
+def check_rect_arrays(rects, pages, font_sizes, block_pairs: int = BLOCK_PAIRS) -> BoundingBoxReport:
+    rects = np.asarray(rects, dtype=float).reshape(-1, 4)
+    rect_pages = np.repeat(np.asarray(pages), 2)
+    font_sizes = np.asarray(font_sizes, dtype=float)
+
+    found = [np.empty((0, 2), dtype=np.intp)]
+    for page in np.unique(rect_pages):
+        found.append(_page_intersections(rects, np.flatnonzero(rect_pages == page), block_pairs))
+    intersections = np.concatenate(found)
+    intersections = intersections[np.lexsort((intersections[:, 1], intersections[:, 0]))]
+
+    entries = rects[1::2]
+    heights = entries[:, 3] - entries[:, 1]
+    # NaN font sizes (no entry text) compare False, like the message-based check.
+    short = np.flatnonzero(heights < font_sizes)
+    return BoundingBoxReport(intersections, short, heights[short], font_sizes[short])
+
+
+# Returns the intersecting pairs among rects[indices], comparing blocks of rows
+# against the following rectangles in order of left edge. A pair (a, b) can only
+# intersect if b's left edge is left of a's right edge, which bounds the columns
+# each block has to look at.
+def _page_intersections(rects, indices, block_pairs):
+    order = indices[np.argsort(rects[indices, 0], kind="stable")]
+    page_rects = rects[order]
+    left = page_rects[:, 0]
+    # NaN coordinates make every comparison pass in rects_intersect, so pages
+    # containing them are compared exhaustively.
+    exhaustive = bool(np.isnan(page_rects).any())
+    count = len(order)
+    rows_per_block = max(1, block_pairs // max(count, 1))
+    pairs = []
+    for start in range(0, count, rows_per_block):
+        stop = min(start + rows_per_block, count)
+        block = page_rects[start:stop]
+        end = count if exhaustive else max(stop, int(np.searchsorted(left, block[:, 2].max(), side="left")))
+        others = page_rects[start + 1:end]
+        if len(others) == 0:
+            continue
+        a = block[:, None, :]
+        b = others[None, :, :]
+        disjoint_horizontal = (a[..., 0] >= b[..., 2]) | (a[..., 2] <= b[..., 0])
+        disjoint_vertical = (a[..., 1] >= b[..., 3]) | (a[..., 3] <= b[..., 1])
+        hit = ~(disjoint_horizontal | disjoint_vertical)
+        # Column c of `others` is page rectangle start + 1 + c; keep each pair once.
+        rows, cols = np.nonzero(hit)
+        rows = rows + start
+        cols = cols + start + 1
+        keep = cols > rows
+        pairs.append(np.column_stack((order[rows[keep]], order[cols[keep]])))
+    if not pairs:
+        return np.empty((0, 2), dtype=np.intp)
+    pairs = np.concatenate(pairs)
+    return np.sort(pairs, axis=1)
+
+
 if __name__ == "__main__":
     if len(sys.argv) != 2:
         print("Usage: check_bounding_boxes.py [fields.json]")
@@ -1,7 +1,8 @@
 import unittest
 import json
 import io
-from check_bounding_boxes import get_bounding_box_messages
+import random
+from check_bounding_boxes import _PageGrid, check_bounding_boxes_batch, get_bounding_box_messages, np
 
 
 # Currently this is not run automatically in CI; it's just for documentation and manual checking.
@@ -222,5 +223,113 @@ class TestGetBoundingBoxMessages(unittest.TestCase):
         self.assertFalse(any("FAILURE" in msg for msg in messages))
     
 
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestCheckBoundingBoxesBatch(unittest.TestCase):
+
+    def test_no_issues(self):
+        """Test that a valid layout produces an empty report"""
+        fields = [
+            {"description": "Name", "page_number": 1, "label_bounding_box": [10, 10, 50, 30], "entry_bounding_box": [50, 10, 150, 30], "entry_text": {"font_size": 14}},
+            {"description": "Email", "page_number": 2, "label_bounding_box": [10, 10, 50, 30], "entry_bounding_box": [50, 10, 150, 30]},
+        ]
+        report = check_bounding_boxes_batch(fields)
+        self.assertTrue(report.ok)
+        self.assertEqual(report.intersections.shape, (0, 2))
+
+    def test_intersections_and_short_entries(self):
+        """Test that rectangle indices and entry heights are reported"""
+        fields = [
+            {"description": "Name", "page_number": 1, "label_bounding_box": [10, 10, 60, 30], "entry_bounding_box": [50, 10, 150, 30]},
+            {"description": "Email", "page_number": 1, "label_bounding_box": [40, 20, 80, 40], "entry_bounding_box": [160, 10, 250, 20], "entry_text": {}},
+            {"description": "Phone", "page_number": 2, "label_bounding_box": [40, 20, 80, 40], "entry_bounding_box": [160, 10, 250, 40], "entry_text": {"font_size": 10}},
+        ]
+        report = check_bounding_boxes_batch(fields)
+        self.assertFalse(report.ok)
+        # Rectangle 2k is field k's label, 2k + 1 its entry
+        self.assertEqual(report.intersections.tolist(), [[0, 1], [0, 2], [1, 2]])
+        self.assertEqual(report.short_entries.tolist(), [1])
+        self.assertEqual(report.entry_heights.tolist(), [10])
+        self.assertEqual(report.font_sizes.tolist(), [14])
+
+    def test_matches_messages_in_small_blocks(self):
+        """Test that block-wise comparison finds the same intersections as the message check"""
+        fields = []
+        for i in range(12):
+            fields.append({
+                "description": f"Field{i}",
+                "page_number": i % 2 + 1,
+                "label_bounding_box": [i * 15, 10, i * 15 + 40, 30],
+                "entry_bounding_box": [i * 15, 40, i * 15 + 20, 60],
+            })
+        messages = get_bounding_box_messages(io.StringIO(json.dumps({"form_fields": fields[:4]})))
+        report = check_bounding_boxes_batch(fields[:4], block_pairs=1)
+        self.assertEqual(len(report.intersections), sum(1 for msg in messages if "FAILURE" in msg))
+        full = check_bounding_boxes_batch(fields)
+        self.assertEqual(check_bounding_boxes_batch(fields, block_pairs=3).intersections.tolist(), full.intersections.tolist())
+
+
+class TestPageGrid(unittest.TestCase):
+
+    @staticmethod
+    def rects_intersect(r1, r2):
+        # Same test as get_bounding_box_messages
+        disjoint_horizontal = r1[0] >= r2[2] or r1[2] <= r2[0]
+        disjoint_vertical = r1[1] >= r2[3] or r1[3] <= r2[1]
+        return not (disjoint_horizontal or disjoint_vertical)
+
+    def random_rect(self, rng):
+        kind = rng.random()
+        if kind < 0.1:
+            # Much larger than a cell, so it spans more than MAX_CELLS_PER_RECT cells
+            x, y = rng.uniform(0, 100), rng.uniform(0, 100)
+            return [x, y, x + rng.uniform(200, 600), y + rng.uniform(200, 600)]
+        if kind < 0.15:
+            # Inverted or empty
+            x, y = rng.uniform(0, 500), rng.uniform(0, 500)
+            return [x, y, x - rng.choice([0, 10]), y + rng.choice([0, 10])]
+        # Small boxes on a coarse lattice, so edges often fall on cell
+        # boundaries and neighbours share an edge
+        x, y = rng.randrange(0, 50) * 10, rng.randrange(0, 50) * 10
+        return [x, y, x + rng.choice([10, 20, 30]), y + rng.choice([10, 20])]
+
+    def test_matches_pairwise_check(self):
+        rng = random.Random(7)
+        for case in range(300):
+            rects = list(enumerate(self.random_rect(rng) for _ in range(rng.randrange(2, 40))))
+            grid = _PageGrid(rects)
+            expected = {
+                (i, j) for i, r1 in rects for j, r2 in rects
+                if i < j and self.rects_intersect(r1, r2)
+            }
+            found = {
+                (i, j) for i, r1 in rects for j in grid.candidates(r1)
+                if i < j and self.rects_intersect(r1, rects[j][1])
+            }
+            self.assertEqual(found, expected, f"case {case}: {rects}")
+
+    def test_messages_match_pairwise_check(self):
+        rng = random.Random(11)
+        for case in range(100):
+            fields = []
+            for i in range(rng.randrange(1, 20)):
+                fields.append({
+                    "description": f"Field {i}",
+                    "page_number": rng.choice([1, 2]),
+                    "label_bounding_box": self.random_rect(rng),
+                    "entry_bounding_box": self.random_rect(rng),
+                })
+            boxes = [(f, kind) for f in fields for kind in ("label", "entry")]
+            expected = sum(
+                1 for a in range(len(boxes)) for b in range(a + 1, len(boxes))
+                if boxes[a][0]["page_number"] == boxes[b][0]["page_number"]
+                and self.rects_intersect(boxes[a][0][f"{boxes[a][1]}_bounding_box"], boxes[b][0][f"{boxes[b][1]}_bounding_box"])
+            )
+            messages = get_bounding_box_messages(io.StringIO(json.dumps({"form_fields": fields})))
+            failures = [m for m in messages if "intersection" in m]
+            # Messages stop after a limited number of failures
+            if expected < 20:
+                self.assertEqual(len(failures), expected, f"case {case}: {messages}")
+
+
 if __name__ == '__main__':
     unittest.main()
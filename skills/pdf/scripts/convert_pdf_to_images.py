@@ -1,35 +1,223 @@
+import argparse
 import os
-import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
+from PIL import Image
+from pypdf import PdfReader
 
+from page_image_cache import DEFAULT_CACHE_SIZE, PageImageCache, page_fingerprints
 
-# Converts each page of a PDF to a PNG image.
 
+# Converts each page of a PDF to a PNG image (or JPEG/WebP).
 
-def convert(pdf_path, output_dir, max_dim=1000):
-    images = convert_from_path(pdf_path, dpi=200)
 
-    for i, image in enumerate(images):
-        # Scale image if needed to keep width/height under `max_dim`
-        width, height = image.size
-        if width > max_dim or height > max_dim:
-            scale_factor = min(max_dim / width, max_dim / height)
-            new_width = int(width * scale_factor)
-            new_height = int(height * scale_factor)
-            image = image.resize((new_width, new_height))
-        
-        image_path = os.path.join(output_dir, f"page_{i+1}.png")
-        image.save(image_path)
-        print(f"Saved page {i+1} as {image_path} (size: {image.size})")
+# Resolution pages are rendered at, unless that would make them larger than `max_dim`.
+DPI = 200
+# Pages rendered per pdftoppm call. Only one chunk of page images is held in
+# memory at a time (per worker), so memory use doesn't depend on the page count.
+CHUNK_PAGES = 8
+# File extension and default quality for each output format.
+IMAGE_FORMATS = {
+    "png": ("png", None),
+    "jpeg": ("jpg", 90),
+    "webp": ("webp", 90),
+}
 
-    print(f"Converted {len(images)} pages to PNG images")
+
+# Renders the pages of `pdf_path` into `output_dir` as page_<n>.<ext>.
+# `pages` is a page selection such as "3-7,12" (default: all pages). With
+# jobs > 1, chunks of pages are rendered by that many worker processes, each
+# running its own pdftoppm. `progress`, if given, is called as
+# progress(pages_done, pages_total, page_number) after each saved page.
+# If `cache_dir` is given, pages are looked up in a PageImageCache there (at
+# most `cache_size` bytes) and only pages not rendered before with the same
+# content and settings are rendered.
+# Returns the number of pages converted.
+def convert(pdf_path, output_dir, max_dim=1000, pages=None, jobs=1, image_format="png", quality=None, progress=None, cache_dir=None, cache_size=DEFAULT_CACHE_SIZE):
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unsupported image format {image_format!r}; use one of {', '.join(IMAGE_FORMATS)}")
+    reader = _open_reader(pdf_path)
+    dpis = _page_dpis(pdf_path, max_dim, reader)
+    page_numbers = parse_page_ranges(pages, len(dpis)) if pages else list(range(1, len(dpis) + 1))
+
+    pages_done = 0
+    cache = None
+    cache_keys = {}
+    if cache_dir is not None and reader is not None:
+        try:
+            fingerprints = page_fingerprints(reader, page_numbers)
+        except Exception as e:
+            print(f"Not using the page cache: {e}")
+        else:
+            cache = PageImageCache(cache_dir, cache_size)
+            for page_number in page_numbers:
+                cache_keys[page_number] = cache.key(fingerprints[page_number], dpis[page_number - 1], max_dim, image_format, quality)
+
+    def report(saved, from_cache=False):
+        nonlocal pages_done
+        for page_number, image_path, size in saved:
+            pages_done += 1
+            if cache and not from_cache:
+                cache.store(cache_keys[page_number], image_path)
+            source = " from cache" if from_cache else ""
+            print(f"Saved page {page_number} as {image_path}{source} (size: {size})")
+            if progress:
+                progress(pages_done, len(page_numbers), page_number)
+
+    to_render = page_numbers
+    if cache:
+        to_render = []
+        for page_number in page_numbers:
+            image_path = _image_path(output_dir, page_number, image_format)
+            if cache.fetch(cache_keys[page_number], image_path):
+                with Image.open(image_path) as image:
+                    report([(page_number, image_path, image.size)], from_cache=True)
+            else:
+                to_render.append(page_number)
+
+    tasks = [
+        (pdf_path, first_page, last_page, dpi, max_dim, output_dir, image_format, quality)
+        for first_page, last_page, dpi in _render_chunks(to_render, dpis)
+    ]
+
+    if jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(_render_chunk, task) for task in tasks]
+            for future in as_completed(futures):
+                report(future.result())
+    else:
+        for task in tasks:
+            report(_render_chunk(task))
+
+    if cache:
+        cache.evict()
+        print(f"Rendered {len(to_render)} pages, {len(page_numbers) - len(to_render)} from cache")
+    print(f"Converted {pages_done} pages to {image_format.upper()} images")
+    return pages_done
+
+
+# Parses a page selection such as "3-7,12" into a sorted list of page numbers.
+# Open ranges ("5-" or "-3") extend to the last or first page.
+def parse_page_ranges(spec, page_count):
+    selected = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if "-" in part:
+                start, end = part.split("-", 1)
+                start = int(start) if start.strip() else 1
+                end = int(end) if end.strip() else page_count
+            else:
+                start = end = int(part)
+        except ValueError:
+            raise ValueError(f"Invalid page range {part!r}")
+        if start < 1 or end > page_count or start > end:
+            raise ValueError(f"Page range {part!r} is outside pages 1-{page_count}")
+        selected.update(range(start, end + 1))
+    if not selected:
+        raise ValueError(f"No pages selected by {spec!r}")
+    return sorted(selected)
+
+
+# Yields (page number, image) for every page of the PDF (or the selected page
+# numbers), rendering CHUNK_PAGES pages at a time. Each page is rendered at the
+# resolution at which its longer side is `max_dim` pixels (at most DPI), instead
+# of rendering at DPI and then downscaling.
+def render_pages(pdf_path, max_dim=1000, page_numbers=None):
+    dpis = _page_dpis(pdf_path, max_dim, _open_reader(pdf_path))
+    if page_numbers is None:
+        page_numbers = range(1, len(dpis) + 1)
+    for first_page, last_page, dpi in _render_chunks(page_numbers, dpis):
+        images = convert_from_path(pdf_path, dpi=dpi, first_page=first_page, last_page=last_page)
+        for offset, image in enumerate(images):
+            yield first_page + offset, _fit_image(image, max_dim)
+        del images
+
+
+# Renders one chunk and saves its pages. Runs in worker processes, so it returns
+# file paths and sizes rather than images.
+def _render_chunk(task):
+    pdf_path, first_page, last_page, dpi, max_dim, output_dir, image_format, quality = task
+    default_quality = IMAGE_FORMATS[image_format][1]
+    save_options = {}
+    if default_quality is not None:
+        save_options["quality"] = quality if quality is not None else default_quality
+    saved = []
+    images = convert_from_path(pdf_path, dpi=dpi, first_page=first_page, last_page=last_page)
+    for offset, image in enumerate(images):
+        page_number = first_page + offset
+        image = _fit_image(image, max_dim)
+        image_path = _image_path(output_dir, page_number, image_format)
+        image.save(image_path, **save_options)
+        saved.append((page_number, image_path, image.size))
+    return saved
+
+
+def _image_path(output_dir, page_number, image_format):
+    return os.path.join(output_dir, f"page_{page_number}.{IMAGE_FORMATS[image_format][0]}")
+
+
+# Scale image if needed to keep width/height under `max_dim`. Pages rendered at
+# their fitting resolution can still be a pixel over due to rounding.
+def _fit_image(image, max_dim):
+    width, height = image.size
+    if width > max_dim or height > max_dim:
+        scale_factor = min(max_dim / width, max_dim / height)
+        new_width = int(width * scale_factor)
+        new_height = int(height * scale_factor)
+        image = image.resize((new_width, new_height))
+    return image
+
+
+# Returns the render resolution of each page, based on its media box (which is
+# what pdftoppm renders). Falls back to DPI for every page if pypdf can't read
+# the page sizes, e.g. for encrypted files.
+def _page_dpis(pdf_path, max_dim, reader):
+    try:
+        sizes = [max(float(page.mediabox.width), float(page.mediabox.height)) for page in reader.pages]
+    except Exception:
+        return [DPI] * pdfinfo_from_path(pdf_path)["Pages"]
+    return [min(DPI, max_dim * 72 / size) if size > 0 else DPI for size in sizes]
+
+
+# Returns a PdfReader for the file, or None if pypdf can't open it.
+def _open_reader(pdf_path):
+    try:
+        return PdfReader(pdf_path)
+    except Exception:
+        return None
+
+
+# Groups runs of consecutive page numbers with the same resolution into
+# [first_page, last_page, dpi] chunks of at most CHUNK_PAGES pages.
+def _render_chunks(page_numbers, dpis):
+    chunks = []
+    for page_number in page_numbers:
+        dpi = dpis[page_number - 1]
+        if chunks and chunks[-1][1] == page_number - 1 and chunks[-1][2] == dpi and page_number - chunks[-1][0] < CHUNK_PAGES:
+            chunks[-1][1] = page_number
+        else:
+            chunks.append([page_number, page_number, dpi])
+    return chunks
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: convert_pdf_to_images.py [input pdf] [output directory]")
-        sys.exit(1)
-    pdf_path = sys.argv[1]
-    output_directory = sys.argv[2]
-    convert(pdf_path, output_directory)
+    parser = argparse.ArgumentParser(description="Convert PDF pages to images")
+    parser.add_argument("pdf_path", help="Input PDF")
+    parser.add_argument("output_dir", help="Directory for page_<n> images")
+    parser.add_argument("--pages", help="Pages to render, e.g. 3-7,12 (default: all)")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes rendering page chunks")
+    parser.add_argument("--format", dest="image_format", choices=sorted(IMAGE_FORMATS), default="png", help="Output image format")
+    parser.add_argument("--quality", type=int, help="JPEG/WebP quality (default 90)")
+    parser.add_argument("--max-dim", type=int, default=1000, help="Maximum width/height in pixels")
+    parser.add_argument("--cache-dir", help="Reuse page images rendered earlier from this cache directory")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE // (1024 * 1024), help="Maximum cache size in MB (default 512)")
+    args = parser.parse_args()
+    try:
+        convert(args.pdf_path, args.output_dir, args.max_dim, args.pages, args.jobs, args.image_format, args.quality,
+                cache_dir=args.cache_dir, cache_size=args.cache_size * 1024 * 1024)
+    except ValueError as e:
+        parser.error(str(e))
@@ -1,5 +1,8 @@
+import argparse
 import json
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 
 from PIL import Image, ImageDraw
 
@@ -13,26 +16,134 @@ def create_validation_image(page_number, fields_json_path, input_path, output_pa
     with open(fields_json_path, 'r') as f:
         data = json.load(f)
 
-        img = Image.open(input_path)
-        draw = ImageDraw.Draw(img)
-        num_boxes = 0
-        
-        for field in data["form_fields"]:
-            if field["page_number"] == page_number:
-                entry_box = field['entry_bounding_box']
-                label_box = field['label_bounding_box']
-                # Draw red rectangle over entry bounding box and blue rectangle over the label.
-                draw.rectangle(entry_box, outline='red', width=2)
-                draw.rectangle(label_box, outline='blue', width=2)
-                num_boxes += 2
-        
+    fields = group_fields_by_page(data["form_fields"]).get(page_number, [])
+    img = Image.open(input_path)
+    num_boxes = draw_field_boxes(img, fields)
+    img.save(output_path)
+    print(f"Created validation image at {output_path} with {num_boxes} bounding boxes")
+
+
+# Returns {page_number: [fields]}, keeping the order of the fields within a page.
+def group_fields_by_page(form_fields):
+    fields_by_page = {}
+    for field in form_fields:
+        fields_by_page.setdefault(field["page_number"], []).append(field)
+    return fields_by_page
+
+
+# Draws the bounding boxes of `fields` onto `img` and returns the number of boxes.
+# `scale` converts fields.json image coordinates to `img` coordinates, for images
+# rendered at a different size than the ones the boxes were determined on.
+def draw_field_boxes(img, fields, scale=(1, 1)):
+    draw = ImageDraw.Draw(img)
+    num_boxes = 0
+    for field in fields:
+        entry_box = [v * s for v, s in zip(field['entry_bounding_box'], scale * 2)]
+        label_box = [v * s for v, s in zip(field['label_bounding_box'], scale * 2)]
+        # Draw red rectangle over entry bounding box and blue rectangle over the label.
+        draw.rectangle(entry_box, outline='red', width=2)
+        draw.rectangle(label_box, outline='blue', width=2)
+        num_boxes += 2
+    return num_boxes
+
+
+# Creates page_<n>_validation.png in `output_dir` for every page listed in
+# fields.json (or having fields), reading fields.json once. `source` is either a
+# directory of page_<n>.png images from convert_pdf_to_images.py, or the PDF
+# itself, whose pages are then rendered and annotated in memory without writing
+# intermediate page images. Pages are processed by `jobs` worker processes.
+# Returns the number of validation images created.
+def create_validation_images(fields_json_path, source, output_dir, jobs=None, max_dim=1000):
+    with open(fields_json_path, 'r') as f:
+        data = json.load(f)
+    fields_by_page = group_fields_by_page(data["form_fields"])
+    image_sizes = {p["page_number"]: (p["image_width"], p["image_height"]) for p in data.get("pages", [])}
+    page_numbers = sorted(set(image_sizes) | set(fields_by_page))
+    os.makedirs(output_dir, exist_ok=True)
+
+    def page_task(page_numbers):
+        return [(n, fields_by_page.get(n, []), image_sizes.get(n)) for n in page_numbers]
+
+    if source.lower().endswith(".pdf"):
+        # Each worker renders a contiguous run of pages so pdftoppm is called per chunk, not per page.
+        jobs = jobs or os.cpu_count() or 1
+        run_length = max(1, -(-len(page_numbers) // jobs))
+        tasks = [
+            (_annotate_rendered_pages, (source, page_task(page_numbers[i:i + run_length]), output_dir, max_dim))
+            for i in range(0, len(page_numbers), run_length)
+        ]
+    else:
+        tasks = [
+            (_annotate_page_images, (source, page_task([n]), output_dir))
+            for n in page_numbers
+        ]
+
+    created = 0
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for results in pool.map(_run_task, tasks):
+            for output_path, num_boxes in results:
+                print(f"Created validation image at {output_path} with {num_boxes} bounding boxes")
+                created += 1
+    return created
+
+
+def _run_task(task):
+    function, args = task
+    return function(*args)
+
+
+def _validation_image_path(output_dir, page_number):
+    return os.path.join(output_dir, f"page_{page_number}_validation.png")
+
+
+def _annotate_page_images(images_dir, pages, output_dir):
+    results = []
+    for page_number, fields, _ in pages:
+        input_path = os.path.join(images_dir, f"page_{page_number}.png")
+        if not os.path.exists(input_path):
+            print(f"Skipping page {page_number}: {input_path} not found")
+            continue
+        with Image.open(input_path) as img:
+            num_boxes = draw_field_boxes(img, fields)
+            output_path = _validation_image_path(output_dir, page_number)
+            img.save(output_path)
+        results.append((output_path, num_boxes))
+    return results
+
+
+def _annotate_rendered_pages(pdf_path, pages, output_dir, max_dim):
+    from convert_pdf_to_images import render_pages
+
+    pages_by_number = {page_number: (fields, size) for page_number, fields, size in pages}
+    results = []
+    for page_number, img in render_pages(pdf_path, max_dim, sorted(pages_by_number)):
+        fields, size = pages_by_number[page_number]
+        scale = (img.width / size[0], img.height / size[1]) if size else (1, 1)
+        num_boxes = draw_field_boxes(img, fields, scale)
+        output_path = _validation_image_path(output_dir, page_number)
         img.save(output_path)
-        print(f"Created validation image at {output_path} with {num_boxes} bounding boxes")
+        results.append((output_path, num_boxes))
+    return results
+
+
+def batch_main(argv):
+    parser = argparse.ArgumentParser(prog="create_validation_image.py --all", description="Create validation images for all pages")
+    parser.add_argument("fields_json", help="fields.json file")
+    parser.add_argument("source", help="Directory of page_<n>.png images, or the PDF to render")
+    parser.add_argument("output_dir", help="Directory for page_<n>_validation.png images")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+    created = create_validation_images(args.fields_json, args.source, args.output_dir, args.jobs)
+    print(f"Created {created} validation images")
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--all":
+        batch_main(sys.argv[2:])
+        sys.exit(0)
     if len(sys.argv) != 5:
         print("Usage: create_validation_image.py [page number] [fields.json file] [input image path] [output image path]")
+        print("       create_validation_image.py --all [fields.json file] [page images dir or input pdf] [output dir] [--jobs N]")
         sys.exit(1)
     page_number = int(sys.argv[1])
     fields_json_path = sys.argv[2]
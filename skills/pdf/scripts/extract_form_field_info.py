@@ -1,7 +1,10 @@
+import hashlib
 import json
+import os
 import sys
 
 from pypdf import PdfReader
+from pypdf.generic import IndirectObject
 
 
 # Extracts data for the fillable form fields in a PDF and outputs JSON that
@@ -19,14 +22,16 @@ def get_full_annotation_field_id(annotation):
     return ".".join(reversed(components)) if components else None
 
 
-def make_field_dict(field, field_id):
+# `states` defaults to the "/_States_" entry that PdfReader `get_fields` adds.
+def make_field_dict(field, field_id, states=None):
+    if states is None:
+        states = field.get("/_States_", [])
     field_dict = {"field_id": field_id}
     ft = field.get('/FT')
     if ft == "/Tx":
         field_dict["type"] = "text"
     elif ft == "/Btn":
         field_dict["type"] = "checkbox"  # radio groups handled separately
-        states = field.get("/_States_", [])
         if len(states) == 2:
             # "/Off" seems to always be the unchecked value, as suggested by
             # https://opensource.adobe.com/dc-acrobat-sdk-docs/standards/pdfstandards/pdf/PDF32000_2008.pdf#page=448
@@ -40,7 +45,6 @@ def make_field_dict(field, field_id):
                 field_dict["unchecked_value"] = states[1]
     elif ft == "/Ch":
         field_dict["type"] = "choice"
-        states = field.get("/_States_", [])
         field_dict["choice_options"] = [{
             "value": state[0],
             "text": state[1],
@@ -60,81 +64,190 @@ def make_field_dict(field, field_id):
 #   },
 # ]
 def get_field_info(reader: PdfReader):
-    fields = reader.get_fields()
-
-    field_info_by_id = {}
-    possible_radio_names = set()
-
-    for field_id, field in fields.items():
-        # Skip if this is a container field with children, except that it might be
-        # a parent group for radio button options.
-        if field.get("/Kids"):
-            if field.get("/FT") == "/Btn":
-                possible_radio_names.add(field_id)
-            continue
-        field_info_by_id[field_id] = make_field_dict(field, field_id)
-
-    # Bounding rects are stored in annotations in page objects.
-
-    # Radio button options have a separate annotation for each choice;
-    # all choices have the same field name.
-    # See https://westhealth.github.io/exploring-fillable-forms-with-pdfrw.html
-    radio_fields_by_id = {}
-
-    for page_index, page in enumerate(reader.pages):
-        annotations = page.get('/Annots', [])
-        for ann in annotations:
-            field_id = get_full_annotation_field_id(ann)
-            if field_id in field_info_by_id:
-                field_info_by_id[field_id]["page"] = page_index + 1
-                field_info_by_id[field_id]["rect"] = ann.get('/Rect')
-            elif field_id in possible_radio_names:
-                try:
-                    # ann['/AP']['/N'] should have two items. One of them is '/Off',
-                    # the other is the active value.
-                    on_values = [v for v in ann["/AP"]["/N"] if v != "/Off"]
-                except KeyError:
+    return FormFieldIndex.from_reader(reader).field_info()
+
+
+# Index of a PDF's fillable fields, built in a single pass over the widget
+# annotations of each page. Maps field id to the `get_field_info` dict plus
+# "widgets": the [object number, generation] of each widget annotation.
+# The index can be saved as JSON together with a fingerprint of the PDF, so
+# repeated fills of the same template don't need to extract fields again:
+#
+#   index = FormFieldIndex.load_or_build("template.pdf", "template.fields.json")
+#   index.get("last_name")["page"]
+class FormFieldIndex:
+    def __init__(self, fields: dict, fingerprint: str = None):
+        self.fields = fields
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def from_reader(cls, reader: PdfReader, fingerprint: str = None):
+        fields = {}
+        radio_fields = {}
+
+        for page_index, page in enumerate(reader.pages):
+            for ann_ref in page.get('/Annots', []):
+                ann = ann_ref.get_object()
+                field = _terminal_field(ann)
+                if field is None:
                     continue
-                if len(on_values) == 1:
-                    rect = ann.get("/Rect")
-                    if field_id not in radio_fields_by_id:
-                        radio_fields_by_id[field_id] = {
-                            "field_id": field_id,
-                            "type": "radio_group",
-                            "page": page_index + 1,
-                            "radio_options": [],
-                        }
-                    # Note: at least on macOS 15.7, Preview.app doesn't show selected
-                    # radio buttons correctly. (It does if you remove the leading slash
-                    # from the value, but that causes them not to appear correctly in
-                    # Chrome/Firefox/Acrobat/etc).
-                    radio_fields_by_id[field_id]["radio_options"].append({
-                        "value": on_values[0],
-                        "rect": rect,
-                    })
-
-    # Some PDFs have form field definitions without corresponding annotations,
-    # so we can't tell where they are. Ignore these fields for now.
-    fields_with_location = []
-    for field_info in field_info_by_id.values():
-        if "page" in field_info:
-            fields_with_location.append(field_info)
-        else:
-            print(f"Unable to determine location for field id: {field_info.get('field_id')}, ignoring")
-
-    # Sort by page number, then Y position (flipped in PDF coordinate system), then X.
-    def sort_key(f):
-        if "radio_options" in f:
-            rect = f["radio_options"][0]["rect"] or [0, 0, 0, 0]
-        else:
-            rect = f.get("rect") or [0, 0, 0, 0]
-        adjusted_position = [-rect[1], rect[0]]
-        return [f.get("page"), adjusted_position]
-    
-    sorted_fields = fields_with_location + list(radio_fields_by_id.values())
-    sorted_fields.sort(key=sort_key)
-
-    return sorted_fields
+                field_id = get_full_annotation_field_id(ann)
+                widget = _object_ref(ann_ref)
+
+                if not field.get("/Kids"):
+                    # A single-widget field: the annotation is the field itself.
+                    if field_id not in fields:
+                        ft = _inherited(field, "/FT")
+                        field_dict = make_field_dict(
+                            {"/FT": ft}, field_id, _field_states(field, ft))
+                        field_dict["widgets"] = []
+                        fields[field_id] = field_dict
+                    fields[field_id]["page"] = page_index + 1
+                    fields[field_id]["rect"] = _plain(ann.get('/Rect'))
+                    fields[field_id]["widgets"].append(widget)
+                elif _inherited(field, "/FT") == "/Btn":
+                    # Radio button options have a separate annotation for each choice;
+                    # all choices have the same field name.
+                    # See https://westhealth.github.io/exploring-fillable-forms-with-pdfrw.html
+                    try:
+                        # ann['/AP']['/N'] should have two items. One of them is '/Off',
+                        # the other is the active value.
+                        on_values = [v for v in ann["/AP"]["/N"] if v != "/Off"]
+                    except KeyError:
+                        continue
+                    if len(on_values) == 1:
+                        if field_id not in radio_fields:
+                            radio_fields[field_id] = {
+                                "field_id": field_id,
+                                "type": "radio_group",
+                                "page": page_index + 1,
+                                "radio_options": [],
+                                "widgets": [],
+                            }
+                        # Note: at least on macOS 15.7, Preview.app doesn't show selected
+                        # radio buttons correctly. (It does if you remove the leading slash
+                        # from the value, but that causes them not to appear correctly in
+                        # Chrome/Firefox/Acrobat/etc).
+                        radio_fields[field_id]["radio_options"].append({
+                            "value": str(on_values[0]),
+                            "rect": _plain(ann.get("/Rect")),
+                        })
+                        radio_fields[field_id]["widgets"].append(widget)
+                # Other fields with several widgets aren't supported.
+
+        fields.update(radio_fields)
+        return cls(fields, fingerprint)
+
+    @classmethod
+    def from_pdf(cls, pdf_path: str):
+        return cls.from_reader(PdfReader(pdf_path), pdf_fingerprint(pdf_path))
+
+    @classmethod
+    def load(cls, index_path: str):
+        with open(index_path) as f:
+            data = json.load(f)
+        return cls(data["fields"], data.get("fingerprint"))
+
+    # Loads the index saved at `index_path` if it was built from this exact PDF,
+    # otherwise builds it and saves it there.
+    @classmethod
+    def load_or_build(cls, pdf_path: str, index_path: str):
+        fingerprint = pdf_fingerprint(pdf_path)
+        if os.path.exists(index_path):
+            index = cls.load(index_path)
+            if index.fingerprint == fingerprint:
+                return index
+        index = cls.from_reader(PdfReader(pdf_path), fingerprint)
+        index.save(index_path)
+        return index
+
+    def save(self, index_path: str):
+        with open(index_path, "w") as f:
+            json.dump({"fingerprint": self.fingerprint, "fields": self.fields}, f)
+
+    def get(self, field_id: str):
+        return self.fields.get(field_id)
+
+    def __contains__(self, field_id):
+        return field_id in self.fields
+
+    def __len__(self):
+        return len(self.fields)
+
+    # Returns the fields in the `get_field_info` format, sorted by page number,
+    # then Y position (flipped in PDF coordinate system), then X.
+    def field_info(self):
+        def sort_key(f):
+            if "radio_options" in f:
+                rect = f["radio_options"][0]["rect"] or [0, 0, 0, 0]
+            else:
+                rect = f.get("rect") or [0, 0, 0, 0]
+            adjusted_position = [-rect[1], rect[0]]
+            return [f.get("page"), adjusted_position]
+
+        info = [
+            {key: value for key, value in field.items() if key != "widgets"}
+            for field in self.fields.values()
+        ]
+        info.sort(key=sort_key)
+        return info
+
+
+# SHA-256 of the PDF's bytes, used to check that a saved index still matches.
+def pdf_fingerprint(pdf_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# The field an annotation belongs to: the annotation itself if it has a name,
+# otherwise its nearest named parent.
+def _terminal_field(annotation):
+    while annotation is not None:
+        if annotation.get('/T'):
+            return annotation
+        annotation = annotation.get('/Parent')
+    return None
+
+
+def _inherited(field, key):
+    while field is not None:
+        if key in field:
+            return field[key]
+        field = field.get('/Parent')
+    return None
+
+
+# Mirrors the "/_States_" values that PdfReader `get_fields` computes.
+def _field_states(field, ft):
+    if ft == "/Btn":
+        try:
+            return [str(state) for state in field["/AP"]["/N"]]
+        except KeyError:
+            return []
+    if ft == "/Ch":
+        options = _inherited(field, "/Opt") or []
+        return [
+            [str(option), str(option)] if isinstance(option, str)
+            else [str(option[0]), str(option[1])]
+            for option in options
+        ]
+    return []
+
+
+def _object_ref(ann_ref):
+    if isinstance(ann_ref, IndirectObject):
+        return [ann_ref.idnum, ann_ref.generation]
+    return None
+
+
+# Converts pypdf number and name objects to plain Python values for JSON.
+def _plain(value):
+    if value is None:
+        return None
+    return [int(v) if isinstance(v, int) else float(v) for v in value]
 
 
 def write_field_info(pdf_path: str, json_output_path: str):
@@ -1,59 +1,209 @@
+import argparse
+import io
 import json
+import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 from pypdf import PdfReader, PdfWriter
 
-from extract_form_field_info import get_field_info
+from extract_form_field_info import FormFieldIndex
 
 
 # Fills fillable form fields in a PDF. See forms.md.
 
 
-def fill_pdf_fields(input_pdf_path: str, fields_json_path: str, output_pdf_path: str):
+# If `index_path` is given, the field index of the input PDF is cached there and
+# reused by later fills of the same PDF instead of extracting fields again.
+# If `incremental` is True, the output is the input PDF followed by an incremental
+# update containing only the changed objects (see FormFiller.fill).
+def fill_pdf_fields(input_pdf_path: str, fields_json_path: str, output_pdf_path: str, index_path: str = None, incremental: bool = False):
     with open(fields_json_path) as f:
         fields = json.load(f)
-    # Group by page number.
-    fields_by_page = {}
-    for field in fields:
-        if "value" in field:
-            field_id = field["field_id"]
-            page = field["page"]
-            if page not in fields_by_page:
-                fields_by_page[page] = {}
-            fields_by_page[page][field_id] = field["value"]
-    
-    reader = PdfReader(input_pdf_path)
-
-    has_error = False
-    field_info = get_field_info(reader)
-    fields_by_ids = {f["field_id"]: f for f in field_info}
-    for field in fields:
-        existing_field = fields_by_ids.get(field["field_id"])
-        if not existing_field:
-            has_error = True
-            print(f"ERROR: `{field['field_id']}` is not a valid field ID")
-        elif field["page"] != existing_field["page"]:
-            has_error = True
-            print(f"ERROR: Incorrect page number for `{field['field_id']}` (got {field['page']}, expected {existing_field['page']})")
+
+    filler = FormFiller(input_pdf_path, index_path)
+    errors = filler.validate(fields)
+    if errors:
+        for err in errors:
+            print(err)
+        sys.exit(1)
+    filler.fill(fields, output_pdf_path, validate=False, incremental=incremental)
+
+
+# Fills one template many times. The template is parsed and its field index and
+# validation rules are computed once; each `fill` then only validates the values
+# and writes a new PDF.
+#
+#   filler = FormFiller("template.pdf")
+#   for i, fields in enumerate(value_sets):
+#       filler.fill(fields, f"filled_{i}.pdf")
+class FormFiller:
+    def __init__(self, template_pdf_path: str, index_path: str = None):
+        self.template_pdf_path = template_pdf_path
+        self.reader = PdfReader(template_pdf_path)
+        if index_path:
+            self.index = FormFieldIndex.load_or_build(template_pdf_path, index_path)
         else:
+            self.index = FormFieldIndex.from_reader(self.reader)
+        # field_id -> allowed values, or None if any value is accepted
+        self.allowed_values = {
+            field_id: _allowed_values(field_info)
+            for field_id, field_info in self.index.fields.items()
+        }
+
+    # Returns a list of error messages for `fields` (in the field_values.json format).
+    def validate(self, fields) -> list:
+        errors = []
+        for field in fields:
+            existing_field = self.index.get(field["field_id"])
+            if not existing_field:
+                errors.append(f"ERROR: `{field['field_id']}` is not a valid field ID")
+            elif field["page"] != existing_field["page"]:
+                errors.append(f"ERROR: Incorrect page number for `{field['field_id']}` (got {field['page']}, expected {existing_field['page']})")
+            elif "value" in field:
+                allowed = self.allowed_values[field["field_id"]]
+                value = field["value"]
+                # Unhashable JSON values (lists, objects) are never valid options.
+                if allowed is not None and (isinstance(value, (list, dict)) or value not in allowed):
+                    errors.append(validation_error_for_field_value(existing_field, field["value"]))
+        return errors
+
+    # Writes a filled copy of the template. Raises ValueError if `validate` is
+    # True and any field is invalid.
+    #
+    # With `incremental=True` the original bytes are kept as-is and only the
+    # modified field, annotation and AcroForm objects are appended with a new
+    # xref section, as the PDF spec allows for incremental updates. The size of
+    # the appended part depends on the number of changed fields, not on the
+    # document. If `output_pdf_path` is the template itself, only the update is
+    # appended to the file.
+    def fill(self, fields, output_pdf_path: str, validate: bool = True, incremental: bool = False):
+        if validate:
+            errors = self.validate(fields)
+            if errors:
+                raise ValueError("\n".join(errors))
+
+        # Group by page number.
+        fields_by_page = {}
+        for field in fields:
             if "value" in field:
-                err = validation_error_for_field_value(existing_field, field["value"])
-                if err:
-                    print(err)
-                    has_error = True
-    if has_error:
-        sys.exit(1)
+                fields_by_page.setdefault(field["page"], {})[field["field_id"]] = field["value"]
 
-    writer = PdfWriter(clone_from=reader)
-    for page, field_values in fields_by_page.items():
-        writer.update_page_form_field_values(writer.pages[page - 1], field_values, auto_regenerate=False)
+        if incremental:
+            # The incremental writer edits the objects of the reader it is given,
+            # so every fill parses its own copy of the template.
+            with open(self.template_pdf_path, "rb") as f:
+                writer = PdfWriter(PdfReader(io.BytesIO(f.read())), incremental=True)
+        else:
+            writer = PdfWriter(clone_from=self.reader)
+        for page, field_values in fields_by_page.items():
+            writer.update_page_form_field_values(writer.pages[page - 1], field_values, auto_regenerate=False)
+
+        # This seems to be necessary for many PDF viewers to format the form values correctly.
+        # It may cause the viewer to show a "save changes" dialog even if the user doesn't make any changes.
+        writer.set_need_appearances_writer(True)
 
-    # This seems to be necessary for many PDF viewers to format the form values correctly.
-    # It may cause the viewer to show a "save changes" dialog even if the user doesn't make any changes.
-    writer.set_need_appearances_writer(True)
-    
-    with open(output_pdf_path, "wb") as f:
-        writer.write(f)
+        if incremental and os.path.exists(output_pdf_path) and os.path.samefile(output_pdf_path, self.template_pdf_path):
+            buffer = io.BytesIO()
+            writer.write(buffer)
+            original_size = os.path.getsize(self.template_pdf_path)
+            with open(output_pdf_path, "ab") as f:
+                f.write(buffer.getbuffer()[original_size:])
+            # The template changed on disk; later fills must start from the new version.
+            self.reader = PdfReader(self.template_pdf_path)
+        else:
+            with open(output_pdf_path, "wb") as f:
+                writer.write(f)
+
+
+# The values `validation_error_for_field_value` accepts for a field, as a set.
+def _allowed_values(field_info):
+    field_type = field_info["type"]
+    if field_type == "checkbox":
+        return {field_info["checked_value"], field_info["unchecked_value"]}
+    elif field_type == "radio_group":
+        return {opt["value"] for opt in field_info["radio_options"]}
+    elif field_type == "choice":
+        return {opt["value"] for opt in field_info["choice_options"]}
+    return None
+
+
+# Batch mode: fills the template once per line of a JSONL file in a process pool.
+# Each line is {"output": "name.pdf", "fields": [...]} where "fields" uses the
+# field_values.json format; "output" is relative to the output directory and
+# defaults to filled_<line number>.pdf. A malformed line is reported as a failed
+# document in the results, in line order, and doesn't stop the batch.
+def fill_pdf_batch(template_pdf_path: str, values_jsonl_path: str, output_dir: str, jobs: int = None, index_path: str = None, incremental: bool = False):
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = []
+    # One per non-blank line: the task's position in `tasks`, or the failed result
+    slots = []
+    with open(values_jsonl_path) as f:
+        for line_number, line in enumerate(f, start=1):
+            if line.strip():
+                output_pdf_path = os.path.join(output_dir, f"filled_{line_number}.pdf")
+                try:
+                    value_set = json.loads(line)
+                    if not isinstance(value_set, dict):
+                        raise TypeError(f"expected an object, not {type(value_set).__name__}")
+                    if value_set.get("output"):
+                        output_pdf_path = os.path.join(output_dir, value_set["output"])
+                    fields = value_set["fields"]
+                    if not isinstance(fields, list):
+                        raise TypeError(f"'fields' must be a list, not {type(fields).__name__}")
+                except (ValueError, KeyError, TypeError) as e:
+                    error = f"line {line_number}: {type(e).__name__}: {e}"
+                    slots.append({"output": output_pdf_path, "seconds": 0.0, "error": error})
+                    continue
+                slots.append(len(tasks))
+                tasks.append((output_pdf_path, fields, incremental))
+
+    if index_path:
+        # Build or refresh the cache once instead of racing in every worker.
+        FormFieldIndex.load_or_build(template_pdf_path, index_path)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(jobs, initializer=_init_batch_worker, initargs=(template_pdf_path, index_path)) as pool:
+        filled = list(pool.map(_fill_batch_task, tasks, chunksize=8))
+    elapsed = time.perf_counter() - start
+    results = [filled[slot] if isinstance(slot, int) else slot for slot in slots]
+    return results, elapsed
+
+
+_batch_filler = None
+
+
+def _init_batch_worker(template_pdf_path, index_path):
+    global _batch_filler
+    monkeypatch_pydpf_method()
+    _batch_filler = FormFiller(template_pdf_path, index_path)
+
+
+def _fill_batch_task(task):
+    output_pdf_path, fields, incremental = task
+    start = time.perf_counter()
+    try:
+        _batch_filler.fill(fields, output_pdf_path, incremental=incremental)
+        error = None
+    except Exception as e:
+        error = str(e)
+    return {"output": output_pdf_path, "seconds": time.perf_counter() - start, "error": error}
+
+
+def _print_batch_summary(results, elapsed):
+    for result in results:
+        if result["error"]:
+            print(f"FAILED {result['output']}:\n{result['error']}")
+    latencies = sorted(result["seconds"] for result in results)
+    failed = sum(1 for result in results if result["error"])
+    print(f"Filled {len(results) - failed} of {len(results)} PDFs in {elapsed:.2f}s ({len(results) / elapsed:.1f} PDFs/s)")
+    if latencies:
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+        print(f"Per-document latency: mean {sum(latencies) / len(latencies) * 1000:.1f} ms, "
+              f"p50 {percentile(0.5):.1f} ms, p95 {percentile(0.95):.1f} ms, max {latencies[-1] * 1000:.1f} ms")
+    return failed
 
 
 def validation_error_for_field_value(field_info, field_value):
@@ -92,6 +242,8 @@ def monkeypatch_pydpf_method():
     from pypdf.constants import FieldDictionaryAttributes
 
     original_get_inherited = DictionaryObject.get_inherited
+    if getattr(original_get_inherited, "_patched", False):
+        return
 
     def patched_get_inherited(self, key: str, default = None):
         result = original_get_inherited(self, key, default)
@@ -100,15 +252,38 @@ def monkeypatch_pydpf_method():
                 result = [r[0] for r in result]
         return result
 
+    patched_get_inherited._patched = True
     DictionaryObject.get_inherited = patched_get_inherited
 
 
+def batch_main(argv):
+    parser = argparse.ArgumentParser(prog="fill_fillable_fields.py --batch", description="Fill one PDF template with many value sets")
+    parser.add_argument("template_pdf")
+    parser.add_argument("values_jsonl", help='One {"output": ..., "fields": [...]} object per line')
+    parser.add_argument("output_dir")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--index", help="Field index cache JSON for the template")
+    parser.add_argument("--incremental", action="store_true", help="Append changes as an incremental update")
+    args = parser.parse_args(argv)
+    results, elapsed = fill_pdf_batch(args.template_pdf, args.values_jsonl, args.output_dir, args.jobs, args.index, args.incremental)
+    if _print_batch_summary(results, elapsed):
+        sys.exit(1)
+
+
 if __name__ == "__main__":
-    if len(sys.argv) != 4:
-        print("Usage: fill_fillable_fields.py [input pdf] [field_values.json] [output pdf]")
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        monkeypatch_pydpf_method()
+        batch_main(sys.argv[2:])
+        sys.exit(0)
+    incremental = "--incremental" in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != "--incremental"]
+    if len(args) not in (3, 4):
+        print("Usage: fill_fillable_fields.py [input pdf] [field_values.json] [output pdf] [optional field index cache json] [--incremental]")
+        print("       fill_fillable_fields.py --batch [template pdf] [values.jsonl] [output dir] [--jobs N] [--index cache json] [--incremental]")
         sys.exit(1)
     monkeypatch_pydpf_method()
-    input_pdf = sys.argv[1]
-    fields_json = sys.argv[2]
-    output_pdf = sys.argv[3]
-    fill_pdf_fields(input_pdf, fields_json, output_pdf)
+    input_pdf = args[0]
+    fields_json = args[1]
+    output_pdf = args[2]
+    index_path = args[3] if len(args) == 4 else None
+    fill_pdf_fields(input_pdf, fields_json, output_pdf, index_path, incremental)
@@ -0,0 +1,68 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import ArrayObject, DictionaryObject, FloatObject, NameObject, TextStringObject
+
+from fill_fillable_fields import fill_pdf_batch
+
+
+# Currently this is not run automatically in CI; it's just for documentation and manual checking.
+
+
+def write_template(path):
+    """One page with a single text field `name`."""
+    writer = PdfWriter()
+    writer.add_blank_page(width=612, height=792)
+    field = DictionaryObject({
+        NameObject("/FT"): NameObject("/Tx"),
+        NameObject("/T"): TextStringObject("name"),
+        NameObject("/Type"): NameObject("/Annot"),
+        NameObject("/Subtype"): NameObject("/Widget"),
+        NameObject("/Rect"): ArrayObject([FloatObject(v) for v in (100, 700, 300, 720)]),
+    })
+    field_ref = writer._add_object(field)
+    writer.pages[0][NameObject("/Annots")] = ArrayObject([field_ref])
+    writer._root_object[NameObject("/AcroForm")] = DictionaryObject({
+        NameObject("/Fields"): ArrayObject([field_ref]),
+    })
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+class TestFillPdfBatch(unittest.TestCase):
+
+    def test_malformed_lines_fail_alone(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            template = os.path.join(temp_dir, "template.pdf")
+            write_template(template)
+            values = os.path.join(temp_dir, "values.jsonl")
+            fields = [{"field_id": "name", "page": 1, "value": "Ada"}]
+            with open(values, "w") as f:
+                f.write(json.dumps({"output": "a.pdf", "fields": fields}) + "\n")
+                f.write("not json\n\n[1]\n")
+                f.write(json.dumps({"output": "b.pdf"}) + "\n")
+                f.write(json.dumps({"fields": fields}) + "\n")
+            output_dir = os.path.join(temp_dir, "out")
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                results, _ = fill_pdf_batch(template, values, output_dir, jobs=1)
+
+            self.assertEqual(
+                [os.path.basename(r["output"]) for r in results],
+                ["a.pdf", "filled_2.pdf", "filled_4.pdf", "b.pdf", "filled_6.pdf"],
+            )
+            self.assertEqual([r["error"] is None for r in results], [True, False, False, False, True])
+            self.assertIn("line 2", results[1]["error"])
+            self.assertIn("'fields'", results[3]["error"])
+            self.assertEqual(sorted(os.listdir(output_dir)), ["a.pdf", "filled_6.pdf"])
+            filled = PdfReader(os.path.join(output_dir, "a.pdf")).get_fields()
+            self.assertEqual(filled["name"]["/V"], "Ada")
+
+
+if __name__ == "__main__":
+    unittest.main()
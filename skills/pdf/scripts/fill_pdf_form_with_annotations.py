@@ -3,6 +3,7 @@ import sys
 
 from pypdf import PdfReader, PdfWriter
 from pypdf.annotations import FreeText
+from pypdf.generic import DictionaryObject, NameObject, RectangleObject, TextStringObject
 
 
 # Fills a PDF by adding text annotations defined in `fields.json`. See forms.md.
@@ -25,8 +26,68 @@ def transform_coordinates(bbox, image_width, image_height, pdf_width, pdf_height
     return left, bottom, right, top
 
 
-def fill_pdf_form(input_pdf_path, fields_json_path, output_pdf_path):
-    """Fill the PDF form with data from fields.json"""
+def transform_boxes(bboxes, image_width, image_height, pdf_width, pdf_height):
+    """Transform bounding boxes on one page; the scale factors are computed once"""
+    x_scale = pdf_width / image_width
+    y_scale = pdf_height / image_height
+    return [
+        (bbox[0] * x_scale, pdf_height - (bbox[3] * y_scale), bbox[2] * x_scale, pdf_height - (bbox[1] * y_scale))
+        for bbox in bboxes
+    ]
+
+
+class FreeTextStylePool:
+    """Create FreeText annotations that share everything but their text and position
+
+    The default style (/DS), default appearance (/DA) and border style (/BS) of
+    annotations with the same font, size and color are written once as shared
+    objects that every such annotation references, instead of being repeated
+    (with pypdf's escaping) in each annotation. Rect coordinates are rounded
+    to 0.01pt.
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self._styles = {}
+        self._border_style = None
+
+    def _shared_style(self, font, font_size, font_color):
+        key = (font, font_size, font_color)
+        style = self._styles.get(key)
+        if style is None:
+            # Let pypdf build the style entries, then replace them with references
+            template = FreeText(
+                text="",
+                rect=(0, 0, 0, 0),
+                font=font,
+                font_size=font_size,
+                font_color=font_color,
+                border_color=None,
+                background_color=None,
+            )
+            if self._border_style is None:
+                self._border_style = self.writer._add_object(template["/BS"])
+            style = self._styles[key] = DictionaryObject({
+                NameObject("/Subtype"): NameObject("/FreeText"),
+                NameObject("/DS"): self.writer._add_object(template["/DS"]),
+                NameObject("/DA"): self.writer._add_object(template["/DA"]),
+                NameObject("/BS"): self._border_style,
+            })
+        return style
+
+    def create(self, text, rect, font, font_size, font_color):
+        annotation = DictionaryObject(self._shared_style(font, font_size, font_color))
+        annotation[NameObject("/Rect")] = RectangleObject([round(float(v), 2) for v in rect])
+        annotation[NameObject("/Contents")] = TextStringObject(text)
+        return annotation
+
+
+def fill_pdf_form(input_pdf_path, fields_json_path, output_pdf_path, pool_styles=True):
+    """Fill the PDF form with data from fields.json
+
+    With pool_styles=False, every annotation is created independently (the
+    previous behavior, kept for comparison in benchmark_fill_annotations.py).
+    """
     
     # `fields.json` format described in forms.md.
     with open(fields_json_path, "r") as f:
@@ -44,50 +105,57 @@ def fill_pdf_form(input_pdf_path, fields_json_path, output_pdf_path):
     for i, page in enumerate(reader.pages):
         mediabox = page.mediabox
         pdf_dimensions[i + 1] = [mediabox.width, mediabox.height]
+    page_infos = {p["page_number"]: p for p in fields_data["pages"]}
     
-    # Process each form field
-    annotations = []
+    # Group the fields that have text by page, keeping their order within a page
+    fields_by_page = {}
     for field in fields_data["form_fields"]:
-        page_num = field["page_number"]
-        
-        # Get page dimensions and transform coordinates.
-        page_info = next(p for p in fields_data["pages"] if p["page_number"] == page_num)
-        image_width = page_info["image_width"]
-        image_height = page_info["image_height"]
-        pdf_width, pdf_height = pdf_dimensions[page_num]
-        
-        transformed_entry_box = transform_coordinates(
-            field["entry_bounding_box"],
-            image_width, image_height,
-            pdf_width, pdf_height
-        )
-        
         # Skip empty fields
         if "entry_text" not in field or "text" not in field["entry_text"]:
             continue
-        entry_text = field["entry_text"]
-        text = entry_text["text"]
-        if not text:
+        if not field["entry_text"]["text"]:
             continue
+        fields_by_page.setdefault(field["page_number"], []).append(field)
+    
+    # Process the fields page by page
+    style_pool = FreeTextStylePool(writer) if pool_styles else None
+    annotations = []
+    for page_num in sorted(fields_by_page):
+        page_fields = fields_by_page[page_num]
         
-        font_name = entry_text.get("font", "Arial")
-        font_size = str(entry_text.get("font_size", 14)) + "pt"
-        font_color = entry_text.get("font_color", "000000")
-
-        # Font size/color seems to not work reliably across viewers:
-        # https://github.com/py-pdf/pypdf/issues/2084
-        annotation = FreeText(
-            text=text,
-            rect=transformed_entry_box,
-            font=font_name,
-            font_size=font_size,
-            font_color=font_color,
-            border_color=None,
-            background_color=None,
+        # Get page dimensions and transform coordinates.
+        page_info = page_infos[page_num]
+        pdf_width, pdf_height = pdf_dimensions[page_num]
+        transformed_entry_boxes = transform_boxes(
+            [field["entry_bounding_box"] for field in page_fields],
+            page_info["image_width"], page_info["image_height"],
+            pdf_width, pdf_height
         )
-        annotations.append(annotation)
+        
         # page_number is 0-based for pypdf
-        writer.add_annotation(page_number=page_num - 1, annotation=annotation)
+        page = writer.pages[page_num - 1]
+        for field, transformed_entry_box in zip(page_fields, transformed_entry_boxes):
+            entry_text = field["entry_text"]
+            font_name = entry_text.get("font", "Arial")
+            font_size = str(entry_text.get("font_size", 14)) + "pt"
+            font_color = entry_text.get("font_color", "000000")
+
+            # Font size/color seems to not work reliably across viewers:
+            # https://github.com/py-pdf/pypdf/issues/2084
+            if style_pool:
+                annotation = style_pool.create(entry_text["text"], transformed_entry_box, font_name, font_size, font_color)
+            else:
+                annotation = FreeText(
+                    text=entry_text["text"],
+                    rect=transformed_entry_box,
+                    font=font_name,
+                    font_size=font_size,
+                    font_color=font_color,
+                    border_color=None,
+                    background_color=None,
+                )
+            annotations.append(annotation)
+            writer.add_annotation(page_number=page, annotation=annotation)
         
     # Save the filled PDF
     with open(output_pdf_path, "wb") as output:
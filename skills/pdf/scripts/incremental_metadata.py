@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Update PDF metadata by appending an incremental update.
+
+Instead of rewriting the whole document, the new Info dictionary (and the XMP
+metadata stream, if the document has one) is appended after the existing
+bytes together with a cross-reference section and trailer pointing back to
+the previous one, as described in section 7.5.6 of the PDF specification.
+Pages and content streams are never parsed. Updating a file in place costs
+only the metadata and a few fsyncs, whatever the size of the document;
+writing to another path copies the document byte for byte first.
+
+In-place appends are journaled: the original size is recorded in a
+`<file>.append-journal` sidecar, fsync'd, before the append, and the sidecar
+is removed once the append is on disk. If a process dies in between, the
+next MetadataUpdate of that file truncates the partial append away.
+
+Usage:
+    from incremental_metadata import IncrementalUpdateError, MetadataUpdate
+
+    try:
+        with MetadataUpdate("report.pdf") as update:
+            print(update.info.get("/Title"))
+            update.write("report.pdf", {"/Author": "Z.ai"})
+    except IncrementalUpdateError:
+        ...  # encrypted or damaged file: rewrite it with PdfWriter instead
+"""
+
+import io
+import os
+import re
+import shutil
+import tempfile
+import xml.etree.ElementTree as ET
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-place appends aren't locked against each other
+    fcntl = None
+
+from pypdf import PdfReader
+from pypdf.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    IndirectObject,
+    NameObject,
+    NumberObject,
+    TextStringObject,
+)
+
+# Bytes at the end of the file searched for the startxref keyword
+TAIL_SIZE = 1024
+
+# Buffer size for copying the document into the temporary output file
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Appended to the PDF's path for the journal of an in-place append
+JOURNAL_SUFFIX = ".append-journal"
+
+RDF_NS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+XML_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+
+# Prefixes used for XMP properties the packet didn't declare yet
+XMP_PREFIXES = {
+    "dc": "http://purl.org/dc/elements/1.1/",
+    "pdf": "http://ns.adobe.com/pdf/1.3/",
+    "xmp": "http://ns.adobe.com/xap/1.0/",
+    "rdf": RDF_NS,
+    "x": "adobe:ns:meta/",
+}
+
+# Info dictionary keys and the XMP properties that mirror them:
+# (namespace, property name, container type or None for a simple value)
+XMP_PROPERTIES = {
+    "/Title": ("http://purl.org/dc/elements/1.1/", "title", "Alt"),
+    "/Author": ("http://purl.org/dc/elements/1.1/", "creator", "Seq"),
+    "/Subject": ("http://purl.org/dc/elements/1.1/", "description", "Alt"),
+    "/Keywords": ("http://ns.adobe.com/pdf/1.3/", "Keywords", None),
+    "/Creator": ("http://ns.adobe.com/xap/1.0/", "CreatorTool", None),
+    "/Producer": ("http://ns.adobe.com/pdf/1.3/", "Producer", None),
+}
+
+
+class IncrementalUpdateError(Exception):
+    """The file can't be updated incrementally (encrypted or damaged)."""
+
+
+class MetadataUpdate:
+    """An open PDF whose metadata can be replaced with an incremental update.
+
+    Only the trailer, the Info dictionary and the catalog are read; pages and
+    content streams are never parsed.
+
+    Attributes:
+        path: Path of the PDF
+        reader: PdfReader over the open file
+        info: Existing Info dictionary (empty DictionaryObject if none)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.exists(path + JOURNAL_SUFFIX):
+            with open(path, "r+b") as f, _locked(f):
+                _roll_back_interrupted_append(path, f)
+        self._file = open(path, "rb")
+        try:
+            self.reader = PdfReader(self._file)
+            if self.reader.is_encrypted:
+                raise IncrementalUpdateError(f"{path} is encrypted")
+            self._prev_xref, self._xref_stream = self._last_xref_section()
+            info = self.reader.trailer.get("/Info")
+            self.info = info.get_object() if info is not None else DictionaryObject()
+        except IncrementalUpdateError:
+            self.close()
+            raise
+        except Exception as e:
+            self.close()
+            raise IncrementalUpdateError(f"Cannot read {path}: {e}") from e
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+    def _last_xref_section(self):
+        """Return the offset of the last cross-reference section and whether it is a stream."""
+        size = self._size = os.fstat(self._file.fileno()).st_size
+        self._file.seek(max(0, size - TAIL_SIZE))
+        tail = self._file.read()
+        match = re.search(rb"startxref\s+(\d+)\s+%%EOF", tail[tail.rfind(b"startxref"):])
+        if not match:
+            raise IncrementalUpdateError("startxref not found")
+        offset = int(match.group(1))
+        self._file.seek(offset)
+        head = self._file.read(32)
+        if head.startswith(b"xref"):
+            return offset, False
+        if re.match(rb"\d+\s+\d+\s+obj", head):
+            return offset, True
+        # pypdf may have repaired the cross-reference table; an update chained to
+        # the broken one would be unreadable for other readers.
+        raise IncrementalUpdateError("startxref does not point to a cross-reference section")
+
+    def write(self, output_path, updates):
+        """Write the PDF with `updates` merged into its Info dictionary.
+
+        Keys mapped to None are removed. If the catalog has an XMP metadata
+        stream, the matching XMP properties are updated as well.
+
+        When output_path is the input file, the update is appended in place
+        under the journal described in the module docstring; this takes
+        milliseconds regardless of the file size. Otherwise the input is
+        copied to a temporary file next to output_path, the update is appended
+        and the file is renamed to output_path, which costs a full copy of the
+        document (about 0.3s for 200MB). Either way an interrupted write never
+        leaves a partly updated PDF behind.
+
+        Returns:
+            int: Number of bytes appended
+
+        Raises:
+            IncrementalUpdateError: If the file changed since it was opened
+        """
+        increment = self._build_increment(updates)
+        if os.path.exists(output_path) and os.path.samefile(output_path, self.path):
+            self._append_in_place(increment)
+            return len(increment)
+
+        output_dir = os.path.dirname(os.path.abspath(output_path))
+        fd, temp_path = tempfile.mkstemp(dir=output_dir, suffix=".pdf.tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                self._file.seek(0)
+                _copy_bytes(self._file, f, self._size)
+                f.write(increment)
+                f.flush()
+                os.fsync(f.fileno())
+            shutil.copymode(self.path, temp_path)
+            os.replace(temp_path, output_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return len(increment)
+
+    def _append_in_place(self, increment):
+        journal_path = self.path + JOURNAL_SUFFIX
+        with open(self.path, "r+b") as f, _locked(f):
+            _roll_back_interrupted_append(self.path, f)
+            original_size = f.seek(0, io.SEEK_END)
+            if original_size != self._size:
+                raise IncrementalUpdateError(f"{self.path} changed while it was being updated")
+
+            # The journal must be on disk before the first appended byte is
+            fd = os.open(journal_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            with os.fdopen(fd, "w") as journal:
+                journal.write(str(original_size))
+                journal.flush()
+                os.fsync(journal.fileno())
+            _fsync_directory(journal_path)
+            try:
+                f.write(increment)
+                f.flush()
+                os.fsync(f.fileno())
+            except BaseException:
+                f.truncate(original_size)
+                os.unlink(journal_path)
+                raise
+            os.unlink(journal_path)
+
+    def _build_increment(self, updates):
+        trailer = self.reader.trailer
+        next_number = int(trailer["/Size"])
+        objects = []
+
+        info = DictionaryObject(self.info)
+        for key, value in updates.items():
+            if value is None:
+                info.pop(key, None)
+            else:
+                info[NameObject(key)] = TextStringObject(value) if isinstance(value, str) else value
+        info_ref = trailer.raw_get("/Info") if "/Info" in trailer else None
+        if not isinstance(info_ref, IndirectObject):
+            info_ref = IndirectObject(next_number, 0, None)
+            next_number += 1
+        objects.append((info_ref, info))
+
+        catalog = trailer["/Root"].get_object()
+        metadata_ref = catalog.raw_get("/Metadata") if "/Metadata" in catalog else None
+        if isinstance(metadata_ref, IndirectObject):
+            xmp = _updated_xmp(metadata_ref.get_object().get_data(), updates)
+            if xmp is not None:
+                stream = DecodedStreamObject()
+                stream[NameObject("/Type")] = NameObject("/Metadata")
+                stream[NameObject("/Subtype")] = NameObject("/XML")
+                stream.set_data(xmp)
+                objects.append((metadata_ref, stream))
+
+        position = self._size
+        self._file.seek(position - 1)
+        out = io.BytesIO()
+        if self._file.read(1) not in b"\r\n":
+            out.write(b"\n")
+
+        offsets = {}
+        for ref, obj in objects:
+            offsets[(ref.idnum, ref.generation)] = position + out.tell()
+            out.write(b"%d %d obj\n" % (ref.idnum, ref.generation))
+            obj.write_to_stream(out)
+            out.write(b"\nendobj\n")
+
+        new_trailer = {
+            NameObject("/Size"): NumberObject(next_number),
+            NameObject("/Root"): trailer.raw_get("/Root"),
+            NameObject("/Info"): info_ref,
+            NameObject("/Prev"): NumberObject(self._prev_xref),
+        }
+        if "/ID" in trailer:
+            new_trailer[NameObject("/ID")] = trailer.raw_get("/ID")
+
+        xref_offset = position + out.tell()
+        if self._xref_stream:
+            self._write_xref_stream(out, new_trailer, offsets, next_number, xref_offset)
+        else:
+            # The free-list head is repeated so readers checking the first entry see object 0
+            out.write(b"xref\n0 1\n0000000000 65535 f\r\n")
+            for (number, generation), offset in sorted(offsets.items()):
+                out.write(b"%d 1\n%010d %05d n\r\n" % (number, offset, generation))
+            out.write(b"trailer\n")
+            DictionaryObject(new_trailer).write_to_stream(out)
+            out.write(b"\n")
+        out.write(b"startxref\n%d\n%%%%EOF\n" % xref_offset)
+        return out.getvalue()
+
+    def _write_xref_stream(self, out, trailer, offsets, number, xref_offset):
+        """Write a cross-reference stream, for files whose last section is one."""
+        offsets = dict(offsets)
+        offsets[(number, 0)] = xref_offset
+        offset_width = max(4, (max(offsets.values()).bit_length() + 7) // 8)
+        index = ArrayObject()
+        data = b""
+        for (idnum, generation), offset in sorted(offsets.items()):
+            index.extend([NumberObject(idnum), NumberObject(1)])
+            data += b"\x01" + offset.to_bytes(offset_width, "big") + generation.to_bytes(2, "big")
+
+        stream = DecodedStreamObject()
+        stream.update(trailer)
+        stream[NameObject("/Type")] = NameObject("/XRef")
+        stream[NameObject("/Size")] = NumberObject(number + 1)
+        stream[NameObject("/W")] = ArrayObject([NumberObject(1), NumberObject(offset_width), NumberObject(2)])
+        stream[NameObject("/Index")] = index
+        stream.set_data(data)
+        out.write(b"%d 0 obj\n" % number)
+        stream.write_to_stream(out)
+        out.write(b"\nendobj\n")
+
+
+def _copy_bytes(source, target, size):
+    remaining = size
+    while remaining:
+        chunk = source.read(min(COPY_BUFFER_SIZE, remaining))
+        if not chunk:
+            raise IncrementalUpdateError("file shrank while it was being updated")
+        target.write(chunk)
+        remaining -= len(chunk)
+
+
+class _locked:
+    """Hold an exclusive lock on an open file (no-op without fcntl)."""
+
+    def __init__(self, f):
+        self._f = f
+
+    def __enter__(self):
+        if fcntl is not None:
+            fcntl.flock(self._f.fileno(), fcntl.LOCK_EX)
+        return self._f
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if fcntl is not None:
+            fcntl.flock(self._f.fileno(), fcntl.LOCK_UN)
+
+
+def _roll_back_interrupted_append(path, f):
+    """Truncate an append whose journal is still there; `f` is `path` opened r+b and locked."""
+    journal_path = path + JOURNAL_SUFFIX
+    try:
+        with open(journal_path) as journal:
+            original_size = int(journal.read())
+    except FileNotFoundError:
+        return
+    except ValueError:
+        # The process died while writing the journal, before appending
+        original_size = None
+    if original_size is not None and f.seek(0, io.SEEK_END) > original_size:
+        f.truncate(original_size)
+        f.flush()
+        os.fsync(f.fileno())
+    os.unlink(journal_path)
+
+
+def _fsync_directory(path):
+    """Make a new directory entry for `path` durable (not possible on Windows)."""
+    if os.name == "nt":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _updated_xmp(xmp, updates):
+    """Return the XMP packet with the properties for `updates` replaced, or None if it can't be parsed."""
+    start = xmp.find(b"<x:xmpmeta")
+    end = xmp.rfind(b"</x:xmpmeta>")
+    if start < 0 or end < 0:
+        return None
+    end += len(b"</x:xmpmeta>")
+    try:
+        # Keep the packet's own prefixes when serializing
+        for prefix, uri in XMP_PREFIXES.items():
+            ET.register_namespace(prefix, uri)
+        for _, (prefix, uri) in ET.iterparse(io.BytesIO(xmp[start:end]), events=("start-ns",)):
+            if prefix and not prefix.startswith("ns"):
+                ET.register_namespace(prefix, uri)
+        root = ET.fromstring(xmp[start:end])
+    except ET.ParseError:
+        return None
+
+    descriptions = root.findall(f".//{{{RDF_NS}}}Description")
+    if not descriptions:
+        return None
+    for key, value in updates.items():
+        if key not in XMP_PROPERTIES:
+            continue
+        namespace, name, container = XMP_PROPERTIES[key]
+        tag = f"{{{namespace}}}{name}"
+        for description in descriptions:
+            description.attrib.pop(tag, None)
+            for element in description.findall(tag):
+                description.remove(element)
+        if value is None:
+            continue
+        element = ET.SubElement(descriptions[0], tag)
+        text = str(value)
+        if container is None:
+            element.text = text
+        else:
+            item = ET.SubElement(ET.SubElement(element, f"{{{RDF_NS}}}{container}"), f"{{{RDF_NS}}}li")
+            if container == "Alt":
+                item.set(XML_LANG, "x-default")
+            item.text = text
+
+    body = ET.tostring(root, encoding="utf-8", xml_declaration=False)
+    return xmp[:start] + body + xmp[end:]
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+from pypdf import PdfReader, PdfWriter
+
+from incremental_metadata import JOURNAL_SUFFIX, IncrementalUpdateError, MetadataUpdate
+
+
+# Currently this is not run automatically in CI; it's just for documentation and manual checking.
+
+
+def write_pdf(path):
+    writer = PdfWriter()
+    writer.add_blank_page(width=612, height=792)
+    writer.add_metadata({"/Title": "Original"})
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+class TestMetadataUpdate(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "doc.pdf")
+        write_pdf(self.path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_update_in_place(self):
+        original = open(self.path, "rb").read()
+        with MetadataUpdate(self.path) as update:
+            appended = update.write(self.path, {"/Author": "Z.ai"})
+
+        with open(self.path, "rb") as f:
+            content = f.read()
+        self.assertEqual(content[:len(original)], original)
+        self.assertEqual(len(content), len(original) + appended)
+        self.assertEqual(PdfReader(self.path).metadata["/Author"], "Z.ai")
+        self.assertFalse(os.path.exists(self.path + JOURNAL_SUFFIX))
+
+    def test_update_to_other_path(self):
+        output = os.path.join(self.temp_dir.name, "out.pdf")
+        with MetadataUpdate(self.path) as update:
+            update.write(output, {"/Author": "Z.ai"})
+        self.assertEqual(PdfReader(output).metadata["/Author"], "Z.ai")
+        self.assertNotIn("/Author", PdfReader(self.path).metadata)
+
+    def test_interrupted_append_is_rolled_back(self):
+        original = open(self.path, "rb").read()
+        # As left by a process killed halfway through an append
+        with open(self.path + JOURNAL_SUFFIX, "w") as journal:
+            journal.write(str(len(original)))
+        with open(self.path, "ab") as f:
+            f.write(b"\n12 0 obj\n<< /Author (Z")
+
+        with MetadataUpdate(self.path) as update:
+            self.assertEqual(update.info["/Title"], "Original")
+        self.assertEqual(open(self.path, "rb").read(), original)
+        self.assertFalse(os.path.exists(self.path + JOURNAL_SUFFIX))
+
+    def test_file_changed_since_opened(self):
+        with MetadataUpdate(self.path) as update:
+            with open(self.path, "ab") as f:
+                f.write(b"\n")
+            with self.assertRaises(IncrementalUpdateError):
+                update.write(self.path, {"/Author": "Z.ai"})
+        self.assertFalse(os.path.exists(self.path + JOURNAL_SUFFIX))
+
+
+if __name__ == "__main__":
+    unittest.main()
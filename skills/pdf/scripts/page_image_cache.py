@@ -0,0 +1,180 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from pypdf.generic import DictionaryObject, IndirectObject, StreamObject
+
+
+# Content-addressed cache of rendered page images, used by convert_pdf_to_images.py.
+#
+# Entries are keyed by a fingerprint of everything on the page that affects
+# rendering (content streams, resources, annotations and their appearance
+# streams, page boxes) plus the render settings, not by the PDF file as a
+# whole. Re-rendering an unchanged PDF is a file copy, and after filling a form
+# only the pages whose content or annotations changed are rendered again. The
+# cache is trimmed to a maximum size on disk, least recently used first.
+
+
+# Default maximum size of the cache directory.
+DEFAULT_CACHE_SIZE = 512 * 1024 * 1024
+
+# Keys that don't affect how a page is drawn but point to other pages or to
+# document structure; following them would make a page's fingerprint depend on
+# unrelated parts of the document.
+IGNORED_KEYS = {"/P", "/Dest", "/A", "/B", "/Thumb", "/Metadata", "/PieceInfo", "/StructParents"}
+
+
+class PageImageCache:
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    # Returns the cache key for a page fingerprint rendered with these settings.
+    def key(self, fingerprint: str, dpi, max_dim, image_format, quality) -> str:
+        settings = f"{fingerprint}:{dpi!r}:{max_dim}:{image_format}:{quality}"
+        return hashlib.sha256(settings.encode()).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    # Copies the cached image for `key` to `dest_path`. Returns False on a miss.
+    def fetch(self, key: str, dest_path: str) -> bool:
+        entry_path = self._entry_path(key)
+        try:
+            shutil.copyfile(entry_path, dest_path)
+        except FileNotFoundError:
+            return False
+        # The modification time records the last use for eviction.
+        os.utime(entry_path)
+        return True
+
+    # Adds the image at `src_path` to the cache under `key`.
+    def store(self, key: str, src_path: str):
+        entry_path = self._entry_path(key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(entry_path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as temp_file, open(src_path, "rb") as src:
+                shutil.copyfileobj(src, temp_file)
+            os.replace(temp_path, entry_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    # Deletes least recently used entries until the cache fits in `max_bytes`.
+    # Returns the number of entries deleted.
+    def evict(self) -> int:
+        entries = []
+        total = 0
+        for dir_path, _, file_names in os.walk(self.cache_dir):
+            for file_name in file_names:
+                if file_name.endswith(".tmp"):
+                    continue
+                path = os.path.join(dir_path, file_name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+                total += stat.st_size
+        entries.sort()
+        evicted = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        return evicted
+
+
+# Returns {page number: fingerprint} for the given 1-based page numbers of a
+# PdfReader. Objects shared between pages (fonts, images) are hashed once.
+def page_fingerprints(reader, page_numbers) -> dict:
+    hasher = _ObjectHasher()
+    # NeedAppearances and the default resources change how form fields are
+    # drawn, so they are part of the fingerprint of pages with form fields.
+    acro_form = reader.trailer["/Root"].get("/AcroForm")
+    form_digest = b""
+    if acro_form is not None:
+        acro_form = acro_form.get_object()
+        form_digest = hasher.digest(DictionaryObject({k: v for k, v in acro_form.items() if k != "/Fields"}))
+    fingerprints = {}
+    for page_number in page_numbers:
+        page = reader.pages[page_number - 1]
+        # pypdf copies inherited attributes into the page, so the page tree
+        # itself isn't needed. (A widget's /Parent is its field, which is.)
+        digest = hasher.digest(DictionaryObject({k: v for k, v in page.items() if k != "/Parent"}))
+        if form_digest and _has_widgets(page):
+            digest = form_digest + digest
+        fingerprints[page_number] = hashlib.sha256(digest).hexdigest()
+    return fingerprints
+
+
+def _has_widgets(page):
+    annotations = page.get("/Annots")
+    if annotations is None:
+        return False
+    return any(annotation.get_object().get("/Subtype") == "/Widget" for annotation in annotations.get_object())
+
+
+class _ObjectHasher:
+    def __init__(self):
+        self._digests = {}
+
+    def digest(self, obj) -> bytes:
+        h = hashlib.sha256()
+        self._update(h, obj, set())
+        return h.digest()
+
+    # Hashes `obj` into `h` and returns the references of enclosing objects
+    # (still in `active`) that `obj` leads back to. Such a cycle is hashed as a
+    # placeholder, so the digest of every object on it (e.g. a widget and its
+    # field, via /Parent and /Kids) depends on where the cycle was entered and
+    # isn't memoized; only digests of objects outside any cycle are reused.
+    def _update(self, h, obj, active) -> set:
+        if isinstance(obj, IndirectObject):
+            ref = (obj.idnum, obj.generation)
+            digest = self._digests.get(ref)
+            if digest is None:
+                if ref in active:
+                    h.update(b"cycle")
+                    return {ref}
+                active.add(ref)
+                sub = hashlib.sha256()
+                open_refs = self._update(sub, obj.get_object(), active)
+                active.discard(ref)
+                digest = sub.digest()
+                if not open_refs:
+                    self._digests[ref] = digest
+                open_refs.discard(ref)
+                h.update(b"R" + digest)
+                return open_refs
+            h.update(b"R" + digest)
+            return set()
+        open_refs = set()
+        if isinstance(obj, dict):
+            h.update(b"<<")
+            for key in sorted(obj):
+                if key in IGNORED_KEYS:
+                    continue
+                h.update(key.encode("utf-8", "surrogateescape") + b" ")
+                open_refs |= self._update(h, obj.raw_get(key) if hasattr(obj, "raw_get") else obj[key], active)
+            h.update(b">>")
+            if isinstance(obj, StreamObject):
+                data = obj._data
+                h.update(b"stream %d " % len(data))
+                h.update(data)
+        elif isinstance(obj, list):
+            h.update(b"[")
+            for item in obj:
+                open_refs |= self._update(h, item, active)
+            h.update(b"]")
+        else:
+            h.update(type(obj).__name__.encode() + b":" + repr(obj).encode("utf-8", "surrogateescape") + b" ")
+        return open_refs
@@ -0,0 +1,70 @@
+import io
+import unittest
+
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import ArrayObject, DictionaryObject, FloatObject, NameObject, TextStringObject
+
+from page_image_cache import page_fingerprints
+
+
+# Currently this is not run automatically in CI; it's just for documentation and manual checking.
+
+
+def build_form(value):
+    """Two pages with one text field whose widgets are on both pages, as a PdfReader."""
+    writer = PdfWriter()
+    for _ in range(2):
+        writer.add_blank_page(width=612, height=792)
+
+    field = DictionaryObject({
+        NameObject("/FT"): NameObject("/Tx"),
+        NameObject("/T"): TextStringObject("name"),
+        NameObject("/V"): TextStringObject(value),
+    })
+    field_ref = writer._add_object(field)
+    kids = ArrayObject()
+    for page in writer.pages:
+        widget = DictionaryObject({
+            NameObject("/Type"): NameObject("/Annot"),
+            NameObject("/Subtype"): NameObject("/Widget"),
+            NameObject("/Parent"): field_ref,
+            NameObject("/P"): page.indirect_reference,
+            NameObject("/Rect"): ArrayObject([FloatObject(v) for v in (100, 700, 300, 720)]),
+        })
+        widget_ref = writer._add_object(widget)
+        kids.append(widget_ref)
+        page[NameObject("/Annots")] = ArrayObject([widget_ref])
+    field[NameObject("/Kids")] = kids
+    writer._root_object[NameObject("/AcroForm")] = DictionaryObject({
+        NameObject("/Fields"): ArrayObject([field_ref]),
+    })
+
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    buffer.seek(0)
+    return PdfReader(buffer)
+
+
+class TestPageFingerprints(unittest.TestCase):
+
+    def test_shared_field_value_changes_every_page(self):
+        before = page_fingerprints(build_form("old"), [1, 2])
+        after = page_fingerprints(build_form("new"), [1, 2])
+        self.assertNotEqual(before[1], after[1])
+        self.assertNotEqual(before[2], after[2])
+
+    def test_fingerprint_does_not_depend_on_other_pages(self):
+        reader = build_form("old")
+        both = page_fingerprints(reader, [1, 2])
+        self.assertEqual(page_fingerprints(build_form("old"), [2])[2], both[2])
+        self.assertEqual(page_fingerprints(build_form("old"), [1])[1], both[1])
+
+    def test_unchanged_form_keeps_fingerprints(self):
+        self.assertEqual(
+            page_fingerprints(build_form("same"), [1, 2]),
+            page_fingerprints(build_form("same"), [1, 2]),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,28 +1,34 @@
 import re
 import html
 import sys
-from typing import Dict
+import os
+import json
+import hashlib
+import argparse
+import tempfile
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
 
 # ---------- Step 0: restore literal unicode escapes/entities to real chars ----------
-_RE_UNICODE_ESC = re.compile(r"(\\u[0-9a-fA-F]{4})|(\\U[0-9a-fA-F]{8})|(\\x[0-9a-fA-F]{2})")
+_RE_UNICODE_ESC = re.compile(r"\\(?:u[0-9a-fA-F]{4}|U[0-9a-fA-F]{8}|x[0-9a-fA-F]{2})")
+
+def _decode_escape(m: re.Match) -> str:
+    esc = m.group(0)
+    try:
+        return chr(int(esc[2:], 16))
+    except ValueError:
+        # Beyond U+10FFFF: leave the escape as written
+        return esc
 
 def _restore_escapes(s: str) -> str:
-    # HTML entities: &#179; &#x2264; &alpha; ...
+    # HTML entities: &#179; &#x2264; &alpha; ... (returns s as is without "&")
     s = html.unescape(s)
 
     # Literal backslash escapes: "\\u00B3" -> "³"
-    def _dec(m: re.Match) -> str:
-        esc = m.group(0)
-        try:
-            if esc.startswith("\\u") or esc.startswith("\\U"):
-                return chr(int(esc[2:], 16))
-            if esc.startswith("\\x"):
-                return chr(int(esc[2:], 16))
-        except Exception:
-            return esc
-        return esc
-
-    return _RE_UNICODE_ESC.sub(_dec, s)
+    if "\\" not in s:
+        return s
+    return _RE_UNICODE_ESC.sub(_decode_escape, s)
 
 # ---------- Step 1: superscripts/subscripts -> <super>/<sub> ----------
 _SUPERSCRIPT_MAP: Dict[str, str] = {
@@ -42,17 +48,6 @@ _SUBSCRIPT_MAP: Dict[str, str] = {
     "ᵥ": "v", "ₓ": "x",
 }
 
-def _replace_super_sub(s: str) -> str:
-    out = []
-    for ch in s:
-        if ch in _SUPERSCRIPT_MAP:
-            out.append(f"<super>{_SUPERSCRIPT_MAP[ch]}</super>")
-        elif ch in _SUBSCRIPT_MAP:
-            out.append(f"<sub>{_SUBSCRIPT_MAP[ch]}</sub>")
-        else:
-            out.append(ch)
-    return "".join(out)
-
 # ---------- Step 2: symbol fallback for SimHei (protect tags, then replace) ----------
 _SYMBOL_FALLBACK: Dict[str, str] = {
     # Currently empty - enable entries as needed for fonts missing specific glyphs
@@ -66,24 +61,36 @@ _SYMBOL_FALLBACK: Dict[str, str] = {
     # "∞": "inf",
 }
 
-def _fallback_symbols(s: str) -> str:
-    # Protect <super>/<sub> tags from being modified
-    placeholders = {}
-    def _protect_tag(m: re.Match) -> str:
-        key = f"@@TAG{len(placeholders)}@@"
-        placeholders[key] = m.group(0)
-        return key
+# ---------- Steps 1+2 as one str.translate table ----------
+# Superscripts/subscripts map to their tags, with the fallback applied to the
+# tag contents; every other character maps to its fallback. A superscript or
+# subscript is converted rather than replaced by its fallback, and tags already
+# in the input are kept as is.
+_RE_TAG = re.compile(r"(</?super>|</?sub>)")
 
-    protected = re.sub(r"</?super>|</?sub>", _protect_tag, s)
+def _build_table() -> Dict[int, str]:
+    def fallback(text: str) -> str:
+        return "".join(_SYMBOL_FALLBACK.get(ch, ch) for ch in text)
 
-    # Replace symbols
-    protected = "".join(_SYMBOL_FALLBACK.get(ch, ch) for ch in protected)
+    table = {ord(ch): repl for ch, repl in _SYMBOL_FALLBACK.items() if len(ch) == 1}
+    for ch, repl in _SUBSCRIPT_MAP.items():
+        table[ord(ch)] = f"<sub>{fallback(repl)}</sub>"
+    for ch, repl in _SUPERSCRIPT_MAP.items():
+        table[ord(ch)] = f"<super>{fallback(repl)}</super>"
+    return table
 
-    # Restore tags
-    for k, v in placeholders.items():
-        protected = protected.replace(k, v)
+_TABLE = _build_table()
+# Only if the fallback touches characters of "<super>"/"<sub>" do tags in the
+# input need to be split off before translating.
+_FALLBACK_HITS_TAGS = any(ch in "</>superb" for ch in _SYMBOL_FALLBACK)
 
-    return protected
+def _replace_symbols(s: str) -> str:
+    if not _FALLBACK_HITS_TAGS:
+        return s.translate(_TABLE)
+    parts = _RE_TAG.split(s)
+    # Odd positions are the tags matched by the split pattern
+    parts[::2] = [part.translate(_TABLE) for part in parts[::2]]
+    return "".join(parts)
 
 def sanitize_code(text: str) -> str:
     """
@@ -92,19 +99,167 @@ def sanitize_code(text: str) -> str:
     - Replace superscript/subscript unicode with <super>/<sub>
     - Replace other risky symbols with ASCII/text fallbacks
     """
-    s = _restore_escapes(text)
-    s = _replace_super_sub(s)
-    s = _fallback_symbols(s)
-    return s
+    return _replace_symbols(_restore_escapes(text))
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python sanitize_code.py <target_script.py>")
+# ---------- Files: sanitize in place, many at a time ----------
+# Escapes, entities and symbols never span lines, so files are sanitized line
+# by line into a temporary file that replaces the original. The state file
+# maps each path to the hash of its content after the last run; a file with
+# the same content now is already sanitized and is skipped (sanitizing twice
+# isn't a no-op: "&amp;lt;" becomes "&lt;", then "<"). By default the state
+# file is kept next to the first target: in it if it is a directory, else
+# beside it.
+DEFAULT_STATE_FILE = ".sanitize_code_state.json"
+
+def default_state_path(paths: List[str]) -> str:
+    """Where the state file for a run over `paths` goes unless given."""
+    first = os.path.abspath(paths[0])
+    directory = first if os.path.isdir(first) else os.path.dirname(first)
+    return os.path.join(directory, DEFAULT_STATE_FILE)
+
+def _file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def sanitize_file(path: str, known_hash: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Sanitize one file in place, atomically.
+
+    Returns (status, content hash after the run), where status is "skipped"
+    (content hash equals known_hash), "unchanged" (nothing to replace; the
+    file isn't rewritten) or "sanitized".
+    """
+    content_hash = _file_hash(path)
+    if content_hash == known_hash:
+        return "skipped", content_hash
+
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".sanitize.tmp")
+    try:
+        changed = False
+        with open(path, "r", encoding="utf-8") as src, os.fdopen(fd, "w", encoding="utf-8") as dst:
+            for line in src:
+                sanitized = sanitize_code(line)
+                changed = changed or sanitized != line
+                dst.write(sanitized)
+        if not changed:
+            os.unlink(temp_path)
+            return "unchanged", content_hash
+        shutil.copymode(path, temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    return "sanitized", _file_hash(path)
+
+def _sanitize_task(task: Tuple[str, Optional[str]]) -> Tuple[str, Optional[str], Optional[str], Optional[str]]:
+    path, known_hash = task
+    try:
+        status, content_hash = sanitize_file(path, known_hash)
+    except Exception as e:
+        return path, None, None, f"{type(e).__name__}: {e}"
+    return path, status, content_hash, None
+
+def collect_paths(paths: Iterable[str]) -> List[str]:
+    """Expand directories to the .py files below them, in a stable order."""
+    found = []
+    for path in paths:
+        if not os.path.isdir(path):
+            found.append(path)
+            continue
+        for dir_path, dir_names, file_names in os.walk(path):
+            dir_names[:] = sorted(d for d in dir_names if not d.startswith(".") and d != "__pycache__")
+            found.extend(os.path.join(dir_path, name) for name in sorted(file_names) if name.endswith(".py"))
+    return found
+
+def _load_state(state_path: str) -> Dict[str, str]:
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return state if isinstance(state, dict) else {}
+
+def _save_state(state_path: str, state: Dict[str, str]) -> None:
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(state_path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=0, sort_keys=True)
+        os.replace(temp_path, state_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+def sanitize_paths(paths: Iterable[str], jobs: Optional[int] = None, state_path: Optional[str] = DEFAULT_STATE_FILE) -> Dict[str, int]:
+    """
+    Sanitize files and directories of .py files in a process pool.
+
+    Files whose content hash matches the state file are skipped; pass
+    state_path=None to sanitize everything without reading or writing state.
+    The default state file goes next to the first path (see default_state_path).
+    Returns counts of "sanitized", "unchanged", "skipped" and "failed" files.
+    """
+    paths = list(paths)
+    if state_path == DEFAULT_STATE_FILE and paths:
+        state_path = default_state_path(paths)
+    files = collect_paths(paths)
+    state = _load_state(state_path) if state_path else {}
+    tasks = [(path, state.get(os.path.abspath(path))) for path in files]
+    counts = {"sanitized": 0, "unchanged": 0, "skipped": 0, "failed": 0}
+
+    if len(tasks) > 1 and (jobs or os.cpu_count() or 1) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(_sanitize_task, tasks, chunksize=max(1, len(tasks) // 64)))
+    else:
+        results = [_sanitize_task(task) for task in tasks]
+
+    for path, status, content_hash, error in results:
+        if error:
+            counts["failed"] += 1
+            state.pop(os.path.abspath(path), None)
+            print(f"Error: {path}: {error}", file=sys.stderr)
+            continue
+        counts[status] += 1
+        state[os.path.abspath(path)] = content_hash
+        if status == "sanitized":
+            print(f"Sanitized: {path}")
+
+    if state_path:
+        # Forget files that have been deleted since
+        _save_state(state_path, {path: h for path, h in state.items() if os.path.exists(path)})
+    return counts
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sanitize PDF generation scripts in place")
+    parser.add_argument("paths", nargs="+", help="Scripts, or directories of .py scripts")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--state", default=None,
+                        help=f"State file of content hashes for skipping files sanitized before "
+                             f"(default with several files or a directory: {DEFAULT_STATE_FILE} "
+                             f"in the first directory given, or beside the first file)")
+    parser.add_argument("--no-state", action="store_true", help="Sanitize every file, ignoring the state file")
+    args = parser.parse_args()
+
+    batch = len(args.paths) > 1 or any(os.path.isdir(path) for path in args.paths)
+    state_path = None if args.no_state else args.state or (default_state_path(args.paths) if batch else None)
+
+    if not batch and state_path is None:
+        status, _ = sanitize_file(args.paths[0])
+        if status == "sanitized":
+            print(f"Sanitized: {args.paths[0]}")
+        else:
+            print(f"Unchanged: {args.paths[0]} (nothing to sanitize)")
+        return
+
+    counts = sanitize_paths(args.paths, args.jobs, state_path)
+    if batch:
+        print(f"Sanitized {counts['sanitized']} files, {counts['unchanged']} unchanged, "
+              f"{counts['skipped']} skipped as already sanitized, {counts['failed']} failed")
+    if counts["failed"]:
         sys.exit(1)
-    target = sys.argv[1]
-    with open(target, "r", encoding="utf-8") as f:
-        code = f.read()
-    sanitized = sanitize_code(code)
-    with open(target, "w", encoding="utf-8") as f:
-        f.write(sanitized)
-    print(f"Sanitized: {target}")
\ No newline at end of file
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import contextlib
+import html
+import io
+import os
+import random
+import re
+import tempfile
+import unittest
+
+import sanitize_code
+from sanitize_code import _SUBSCRIPT_MAP, _SUPERSCRIPT_MAP, DEFAULT_STATE_FILE, sanitize_code as sanitize, sanitize_paths
+
+
+# Currently this is not run automatically in CI; it's just for documentation and manual checking.
+
+
+# The original multi-pass pipeline, kept as the reference the single-pass
+# implementation must match byte for byte.
+def reference_sanitize(text, fallback):
+    s = html.unescape(text)
+
+    def dec(m):
+        try:
+            return chr(int(m.group(0)[2:], 16))
+        except Exception:
+            return m.group(0)
+
+    s = re.sub(r"(\\u[0-9a-fA-F]{4})|(\\U[0-9a-fA-F]{8})|(\\x[0-9a-fA-F]{2})", dec, s)
+
+    out = []
+    for ch in s:
+        if ch in _SUPERSCRIPT_MAP:
+            out.append(f"<super>{_SUPERSCRIPT_MAP[ch]}</super>")
+        elif ch in _SUBSCRIPT_MAP:
+            out.append(f"<sub>{_SUBSCRIPT_MAP[ch]}</sub>")
+        else:
+            out.append(ch)
+    s = "".join(out)
+
+    placeholders = {}
+
+    def protect(m):
+        key = f"@@TAG{len(placeholders)}@@"
+        placeholders[key] = m.group(0)
+        return key
+
+    protected = re.sub(r"</?super>|</?sub>", protect, s)
+    protected = "".join(fallback.get(ch, ch) for ch in protected)
+    for k, v in placeholders.items():
+        protected = protected.replace(k, v)
+    return protected
+
+
+CORPUS = [
+    "",
+    "plain ascii text\n",
+    'story.append(Paragraph("E = mc²", style))',
+    "H₂O and CO₂ at 10⁻³ mol",
+    "x&#178; + y&#xB2; &lt;= z&sup2; &amp;&amp; &alpha;&beta;",
+    "literal \\u00B3 and \\U000000B2 and \\xb9 escapes",
+    "double-escaped &#92;u00B3 and \\\\u00b2",
+    "invalid \\U0011FFFF and short \\u12 and \\x4",
+    "existing <super>2</super> and <sub>i</sub> tags with ⁿ and ᵢ",
+    "aₐeₑ ≤ ≥ ± × ÷ ∞ ≈ ≠ 😀",
+    "@@TAG0@@ is just text",
+    "broken &#; &#x; &unknownentity; & alone",
+]
+
+
+def random_document(rng, length):
+    pieces = list(_SUPERSCRIPT_MAP) + list(_SUBSCRIPT_MAP) + [
+        "a", "s", "u", "p", "e", "r", "b", "<", ">", "/", " ", "\n", "±", "×", "≤",
+        "<super>", "</sub>", "&#179;", "&sup3;", "&lt;sub&gt;", "\\u00b2", "\\x", "\\", "&",
+    ]
+    return "".join(rng.choice(pieces) for _ in range(length))
+
+
+class TestSanitizeCode(unittest.TestCase):
+
+    def assert_matches_reference(self, fallback):
+        rng = random.Random(1)
+        documents = CORPUS + [random_document(rng, rng.randrange(200)) for _ in range(500)]
+        for text in documents:
+            self.assertEqual(sanitize(text), reference_sanitize(text, fallback), repr(text))
+
+    def test_matches_reference(self):
+        self.assert_matches_reference(sanitize_code._SYMBOL_FALLBACK)
+
+    def test_matches_reference_with_fallbacks(self):
+        saved = (sanitize_code._SYMBOL_FALLBACK, sanitize_code._TABLE, sanitize_code._FALLBACK_HITS_TAGS)
+        for fallback in (
+            {"±": "+/-", "×": "*", "≤": "<="},
+            # Also touches characters of the tags and of their contents
+            {"±": "+/-", "×": "*", "≤": "<=", "+": "plus", "s": "S", "<": "&lt;"},
+        ):
+            with self.subTest(fallback=fallback):
+                try:
+                    sanitize_code._SYMBOL_FALLBACK = fallback
+                    sanitize_code._TABLE = sanitize_code._build_table()
+                    sanitize_code._FALLBACK_HITS_TAGS = any(ch in "</>superb" for ch in fallback)
+                    self.assert_matches_reference(fallback)
+                finally:
+                    sanitize_code._SYMBOL_FALLBACK, sanitize_code._TABLE, sanitize_code._FALLBACK_HITS_TAGS = saved
+
+    def test_examples(self):
+        self.assertEqual(sanitize("E = mc²"), "E = mc<super>2</super>")
+        self.assertEqual(sanitize("H&#8322;O"), "H<sub>2</sub>O")
+        self.assertEqual(sanitize("10\\u207b\\u00b3"), "10<super>-</super><super>3</super>")
+
+
+class TestSanitizePaths(unittest.TestCase):
+
+    def test_skips_files_sanitized_before(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            scripts_dir = os.path.join(temp_dir, "scripts")
+            os.makedirs(os.path.join(scripts_dir, "sub"))
+            texts = {"a.py": "x = 'm²'\n", os.path.join("sub", "b.py"): "y = '&amp;lt;'\n", "c.py": "z = 1\n"}
+            for name, text in texts.items():
+                with open(os.path.join(scripts_dir, name), "w", encoding="utf-8") as f:
+                    f.write(text)
+            state_path = os.path.join(temp_dir, "state.json")
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                first = sanitize_paths([scripts_dir], jobs=1, state_path=state_path)
+                second = sanitize_paths([scripts_dir], jobs=1, state_path=state_path)
+            self.assertEqual(first, {"sanitized": 2, "unchanged": 1, "skipped": 0, "failed": 0})
+            self.assertEqual(second, {"sanitized": 0, "unchanged": 0, "skipped": 3, "failed": 0})
+            for name, text in texts.items():
+                with open(os.path.join(scripts_dir, name), encoding="utf-8") as f:
+                    # Sanitizing twice would turn "&lt;" into "<"
+                    self.assertEqual(f.read(), sanitize(text))
+
+    def test_default_state_file_is_in_first_directory(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with open(os.path.join(temp_dir, "a.py"), "w", encoding="utf-8") as f:
+                f.write("x = 'm²'\n")
+            with contextlib.redirect_stdout(io.StringIO()):
+                sanitize_paths([temp_dir], jobs=1)
+                second = sanitize_paths([temp_dir], jobs=1)
+            self.assertTrue(os.path.exists(os.path.join(temp_dir, DEFAULT_STATE_FILE)))
+            self.assertEqual(second["skipped"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
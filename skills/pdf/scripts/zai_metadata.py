@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Z.ai metadata stamping shared by the add_zai_metadata command-line tools.
+
+A file is only written if its Info dictionary doesn't already hold the
+desired values; checking that reads just the trailer and the Info dictionary.
+Files that need stamping get an incremental update (see
+incremental_metadata.py), or a full rewrite if they are encrypted or damaged.
+
+Usage:
+    from zai_metadata import stamp_pdf
+
+    result = stamp_pdf("report.pdf")
+    result.status   # "skipped", "updated" or "rewritten"
+    result.title    # title in the stamped file
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from pypdf import PdfReader, PdfWriter
+
+from incremental_metadata import IncrementalUpdateError, MetadataUpdate
+
+# Info entries set on every stamped file
+ZAI_FIELDS = {
+    '/Author': 'Z.ai',
+    '/Creator': 'Z.ai',
+    '/Producer': 'http://z.ai',
+}
+
+# Titles treated as missing when keeping the original title
+PLACEHOLDER_TITLES = ('(anonymous)', 'unspecified')
+
+
+@dataclass
+class StampResult:
+    """Outcome of stamping one file.
+
+    Attributes:
+        status: "skipped" (already stamped), "updated" (incremental update)
+                or "rewritten" (full rewrite)
+        title: Title of the output file
+        input_size: Size of the input file in bytes
+        metadata: Info entries the output file has (see desired_metadata())
+    """
+    status: str
+    title: str
+    input_size: int
+    metadata: dict
+
+
+def desired_metadata(info, input_pdf_path, title=None, keep_title=True, fields=ZAI_FIELDS, defaults=None):
+    """
+    Return the Info entries a stamped copy of a PDF should have.
+
+    Args:
+        info: Existing Info dictionary (may be empty)
+        input_pdf_path: Path of the PDF, used for the fallback title
+        title: Custom title (default: see keep_title)
+        keep_title: Keep an existing non-placeholder title; otherwise the
+                    filename without extension is used
+        fields: Entries that are always set
+        defaults: Entries that are only set if the file doesn't have them
+
+    Returns:
+        dict: Info keys to values
+    """
+    if not title:
+        original_title = info.get('/Title')
+        if keep_title and original_title and original_title not in PLACEHOLDER_TITLES:
+            title = str(original_title)
+        else:
+            # Use filename without extension as title
+            title = os.path.splitext(os.path.basename(input_pdf_path))[0]
+    metadata = {'/Title': title}
+    metadata.update(fields)
+    for key, value in (defaults or {}).items():
+        metadata[key] = str(info[key]) if key in info else value
+    return metadata
+
+
+def is_stamped(info, metadata):
+    """Return True if the Info dictionary already holds all of `metadata`."""
+    return all(key in info and str(info[key]) == value for key, value in metadata.items())
+
+
+def stamp_pdf(input_pdf_path, output_pdf_path=None, title=None, keep_title=True, fields=ZAI_FIELDS, defaults=None, force=False):
+    """
+    Stamp Z.ai metadata on a PDF unless it already has it.
+
+    Already-stamped files are left alone (or copied unchanged when
+    output_pdf_path is another path) unless `force` is set. Other files get an
+    incremental update; encrypted or damaged files are rewritten page by page
+    into a temporary file that is renamed over the output.
+
+    Args:
+        input_pdf_path: Path to input PDF
+        output_pdf_path: Path to output PDF (default: overwrites input)
+        title, keep_title, fields, defaults: See desired_metadata()
+        force: Write the metadata even if the file already has it
+
+    Returns:
+        StampResult
+
+    Raises:
+        OSError: If the input can't be read or the output can't be written
+        Exception: Any pypdf error for unreadable input
+    """
+    if output_pdf_path is None:
+        output_pdf_path = input_pdf_path
+    input_size = os.path.getsize(input_pdf_path)
+
+    try:
+        with MetadataUpdate(input_pdf_path) as update:
+            metadata = desired_metadata(update.info, input_pdf_path, title, keep_title, fields, defaults)
+            if not force and is_stamped(update.info, metadata):
+                _copy_unchanged(input_pdf_path, output_pdf_path)
+                return StampResult('skipped', metadata['/Title'], input_size, metadata)
+            update.write(output_pdf_path, metadata)
+            return StampResult('updated', metadata['/Title'], input_size, metadata)
+    except IncrementalUpdateError:
+        pass
+
+    reader = PdfReader(input_pdf_path)
+    info = reader.metadata or {}
+    metadata = desired_metadata(info, input_pdf_path, title, keep_title, fields, defaults)
+    if not force and is_stamped(info, metadata):
+        _copy_unchanged(input_pdf_path, output_pdf_path)
+        return StampResult('skipped', metadata['/Title'], input_size, metadata)
+
+    writer = PdfWriter()
+    # Copy all pages
+    for page in reader.pages:
+        writer.add_page(page)
+    writer.add_metadata(metadata)
+    _replace_atomically(output_pdf_path, writer.write, input_pdf_path)
+    return StampResult('rewritten', metadata['/Title'], input_size, metadata)
+
+
+def _copy_unchanged(input_pdf_path, output_pdf_path):
+    if os.path.exists(output_pdf_path) and os.path.samefile(input_pdf_path, output_pdf_path):
+        return
+
+    def copy(output):
+        with open(input_pdf_path, 'rb') as source:
+            shutil.copyfileobj(source, output)
+
+    _replace_atomically(output_pdf_path, copy, input_pdf_path)
+
+
+def _replace_atomically(output_pdf_path, write, input_pdf_path):
+    """Call write(file) on a temporary file next to the output, then rename it over the output.
+
+    The output keeps its permissions, or gets the input's if it is new.
+    """
+    output_dir = os.path.dirname(os.path.abspath(output_pdf_path))
+    fd, temp_path = tempfile.mkstemp(dir=output_dir, prefix='.zai-', suffix='.pdf.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as output:
+            write(output)
+        shutil.copymode(output_pdf_path if os.path.exists(output_pdf_path) else input_pdf_path, temp_path)
+        os.replace(temp_path, output_pdf_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def _stamp_task(task):
+    """Process pool worker: stamp one file and report the outcome."""
+    input_path, output_path, options = task
+    try:
+        return input_path, output_path, stamp_pdf(input_path, output_path, **options), None
+    except Exception as e:
+        return input_path, output_path, None, f"{type(e).__name__}: {e}"
+
+
+def stamp_files(tasks, jobs=1, on_result=None, verbose=True):
+    """
+    Stamp many PDFs, optionally in a process pool, and print a summary.
+
+    Args:
+        tasks: List of (input path, output path, stamp_pdf keyword arguments)
+        jobs: Number of worker processes (1 processes files in this process)
+        on_result: Called as on_result(input_path, output_path, StampResult)
+                   for each successfully processed file
+        verbose: Print the summary
+
+    Returns:
+        dict: Counts of "skipped", "updated", "rewritten" and "failed" files
+    """
+    start = time.perf_counter()
+    counts = {'skipped': 0, 'updated': 0, 'rewritten': 0, 'failed': 0}
+    total_bytes = 0
+
+    if jobs > 1 and len(tasks) > 1:
+        pool = ProcessPoolExecutor(max_workers=jobs)
+        results = pool.map(_stamp_task, tasks, chunksize=max(1, len(tasks) // (jobs * 8)))
+    else:
+        pool = None
+        results = map(_stamp_task, tasks)
+
+    try:
+        for input_path, output_path, result, error in results:
+            if error:
+                counts['failed'] += 1
+                print(f"Error: {input_path}: {error}", file=sys.stderr)
+                continue
+            counts[result.status] += 1
+            total_bytes += result.input_size
+            if on_result:
+                on_result(input_path, output_path, result)
+    finally:
+        if pool:
+            pool.shutdown()
+
+    elapsed = time.perf_counter() - start
+    if verbose:
+        processed = len(tasks) - counts['failed']
+        rate = processed / elapsed if elapsed else 0
+        throughput = total_bytes / (1024 * 1024) / elapsed if elapsed else 0
+        print(f"Stamped {counts['updated'] + counts['rewritten']} files "
+              f"({counts['rewritten']} rewritten in full), skipped {counts['skipped']} already stamped, "
+              f"{counts['failed']} failed in {elapsed:.2f}s: {rate:.1f} files/s, {throughput:.1f} MB/s")
+    return counts
@@ -9,8 +9,17 @@ import sys
 import subprocess
 import os
 import platform
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
 from pathlib import Path
-from openpyxl import load_workbook
+
+EXCEL_ERRORS = ['#VALUE!', '#DIV/0!', '#REF!', '#NAME?', '#NULL!', '#NUM!', '#N/A']
+
+# Locations reported per error type
+MAX_LOCATIONS = 20
+
+REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
 
 
 def setup_libreoffice_macro():
@@ -100,61 +109,241 @@ def recalc(filename, timeout=30):
     
     # Check for Excel errors in the recalculated file - scan ALL cells
     try:
-        wb = load_workbook(filename, data_only=True)
-        
-        excel_errors = ['#VALUE!', '#DIV/0!', '#REF!', '#NAME?', '#NULL!', '#NUM!', '#N/A']
-        error_details = {err: [] for err in excel_errors}
-        total_errors = 0
-        
-        for sheet_name in wb.sheetnames:
-            ws = wb[sheet_name]
-            # Check ALL rows and columns - no limits
-            for row in ws.iter_rows():
-                for cell in row:
-                    if cell.value is not None and isinstance(cell.value, str):
-                        for err in excel_errors:
-                            if err in cell.value:
-                                location = f"{sheet_name}!{cell.coordinate}"
-                                error_details[err].append(location)
-                                total_errors += 1
-                                break
-        
-        wb.close()
-        
-        # Build result summary
-        result = {
-            'status': 'success' if total_errors == 0 else 'errors_found',
-            'total_errors': total_errors,
-            'error_summary': {}
-        }
-        
-        # Add non-empty error categories
-        for err_type, locations in error_details.items():
-            if locations:
-                result['error_summary'][err_type] = {
-                    'count': len(locations),
-                    'locations': locations[:20]  # Show up to 20 locations
-                }
-        
-        # Add formula count for context - also check ALL cells
-        wb_formulas = load_workbook(filename, data_only=False)
-        formula_count = 0
-        for sheet_name in wb_formulas.sheetnames:
-            ws = wb_formulas[sheet_name]
-            for row in ws.iter_rows():
-                for cell in row:
-                    if cell.value and isinstance(cell.value, str) and cell.value.startswith('='):
-                        formula_count += 1
-        wb_formulas.close()
-        
-        result['total_formulas'] = formula_count
-        
-        return result
-        
+        return scan_workbook(filename)
     except Exception as e:
         return {'error': str(e)}
 
 
+def scan_workbook(filename):
+    """
+    Find Excel errors and count formulas in all cells of an .xlsx file
+
+    Streams the sheet XML parts instead of loading the workbook with openpyxl.
+    A cell's cached value and its formula are in the same <c> element, so one
+    pass over each sheet gives both, and memory use doesn't grow with the
+    number of cells. Cells are judged as openpyxl would load them: a string
+    value containing an error code is an error (data_only=True), a string
+    value starting with '=' is a formula (data_only=False).
+
+    Args:
+        filename: Path to Excel file
+
+    Returns:
+        dict with status, total_errors, error_summary and total_formulas
+    """
+    error_counts = {err: 0 for err in EXCEL_ERRORS}
+    error_locations = {err: [] for err in EXCEL_ERRORS}
+    formula_count = 0
+
+    with zipfile.ZipFile(filename) as archive:
+        shared_strings_path, sheets = _workbook_parts(archive)
+        shared_strings = _scan_shared_strings(archive, shared_strings_path) if shared_strings_path else {}
+        for sheet_name, sheet_path in sheets:
+            with archive.open(sheet_path) as sheet_xml:
+                for coordinate, error, is_formula in _scan_sheet(sheet_xml, shared_strings):
+                    if is_formula:
+                        formula_count += 1
+                    if error:
+                        error_counts[error] += 1
+                        if len(error_locations[error]) < MAX_LOCATIONS:
+                            error_locations[error].append(f"{sheet_name}!{coordinate}")
+
+    total_errors = sum(error_counts.values())
+
+    # Build result summary
+    result = {
+        'status': 'success' if total_errors == 0 else 'errors_found',
+        'total_errors': total_errors,
+        'error_summary': {}
+    }
+
+    # Add non-empty error categories
+    for err_type, count in error_counts.items():
+        if count:
+            result['error_summary'][err_type] = {
+                'count': count,
+                'locations': error_locations[err_type]  # Show up to 20 locations
+            }
+
+    # Add formula count for context
+    result['total_formulas'] = formula_count
+
+    return result
+
+
+def _local_name(tag):
+    return tag.rpartition('}')[2]
+
+
+def _error_type(value):
+    for err in EXCEL_ERRORS:
+        if err in value:
+            return err
+    return None
+
+
+def _text_content(element):
+    """Plain text of a shared or inline string: its <t> and rich text runs, without phonetic runs"""
+    snippets = []
+    for child in element:
+        name = _local_name(child.tag)
+        if name == 't':
+            snippets.append(child.text or '')
+        elif name == 'r':
+            snippets.extend(t.text or '' for t in child if _local_name(t.tag) == 't')
+    return ''.join(snippets)
+
+
+def _read_rels(archive, part_path):
+    """Map relationship ids of a part to (type, target path in the archive)"""
+    rels_path = posixpath.join(posixpath.dirname(part_path), '_rels', posixpath.basename(part_path) + '.rels')
+    rels = {}
+    with archive.open(rels_path) as f:
+        for rel in ET.parse(f).getroot():
+            target = rel.get('Target', '')
+            if target.startswith('/'):
+                target = target[1:]
+            else:
+                target = posixpath.normpath(posixpath.join(posixpath.dirname(part_path), target))
+            rels[rel.get('Id')] = (rel.get('Type', ''), target)
+    return rels
+
+
+def _workbook_parts(archive):
+    """Return the shared strings path (or None) and [(sheet name, path)] of the worksheets in order"""
+    workbook_path = next(
+        (target for rel_type, target in _read_rels(archive, '').values() if rel_type.endswith('/officeDocument')),
+        'xl/workbook.xml'
+    )
+    rels = _read_rels(archive, workbook_path)
+    shared_strings_path = next(
+        (target for rel_type, target in rels.values() if rel_type.endswith('/sharedStrings')), None
+    )
+    sheets = []
+    with archive.open(workbook_path) as f:
+        for element in ET.parse(f).getroot().iter():
+            if _local_name(element.tag) != 'sheet':
+                continue
+            rel_id = element.get(REL_NS + 'id') or next(
+                (value for key, value in element.attrib.items() if _local_name(key) == 'id'), None
+            )
+            rel_type, target = rels.get(rel_id, ('', None))
+            # Chartsheets have no cells
+            if target and rel_type.endswith('/worksheet'):
+                sheets.append((element.get('name'), target))
+    return shared_strings_path, sheets
+
+
+def _scan_shared_strings(archive, path):
+    """
+    Map the index of each shared string that matters to the scan to
+    (error type or None, starts with '='). Other strings aren't kept.
+    """
+    flagged = {}
+    index = 0
+    with archive.open(path) as f:
+        context = ET.iterparse(f, events=('start', 'end'))
+        _, root = next(context)
+        for event, element in context:
+            if event != 'end' or _local_name(element.tag) != 'si':
+                continue
+            # openpyxl drops the escape prefix of _x005F_xHHHH_ sequences
+            text = _text_content(element).replace('x005F_', '')
+            error = _error_type(text)
+            if error or text.startswith('='):
+                flagged[index] = (error, text.startswith('='))
+            index += 1
+            root.clear()
+    return flagged
+
+
+def _column_letter(column):
+    letters = ''
+    while column:
+        column, remainder = divmod(column - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _column_index(coordinate):
+    column = 0
+    for ch in coordinate:
+        if not ch.isalpha():
+            break
+        column = column * 26 + ord(ch.upper()) - 64
+    return column
+
+
+def _scan_sheet(sheet_xml, shared_strings):
+    """Yield (coordinate, error type or None, is formula) for each cell that has either"""
+    context = ET.iterparse(sheet_xml, events=('start', 'end'))
+    # Tags repeat for every cell; strip their namespace once
+    local_names = {}
+    sheet_data = None
+    row_number = 0
+    column = 0
+    for event, element in context:
+        name = local_names.get(element.tag)
+        if name is None:
+            name = local_names[element.tag] = _local_name(element.tag)
+        if event == 'start':
+            if name == 'sheetData':
+                sheet_data = element
+            elif name == 'row' and sheet_data is not None:
+                row_number = int(element.get('r')) if element.get('r') else row_number + 1
+                column = 0
+            continue
+        if name == 'row':
+            # Finished rows are dropped so memory stays constant
+            if sheet_data is not None:
+                sheet_data.clear()
+            continue
+        if name != 'c':
+            continue
+
+        coordinate = element.get('r')
+        if coordinate:
+            column = _column_index(coordinate)
+        else:
+            column += 1
+            coordinate = f"{_column_letter(column)}{row_number}"
+
+        data_type = element.get('t', 'n')
+        formula = None
+        value = None
+        inline = None
+        for child in element:
+            child_name = local_names.get(child.tag) or _local_name(child.tag)
+            if child_name == 'f':
+                formula = child
+            elif child_name == 'v':
+                value = child.text or None
+            elif child_name == 'is':
+                inline = _text_content(child)
+
+        # Value as loaded with data_only=True
+        error = None
+        starts_with_equals = False
+        if data_type == 's' and value is not None:
+            error, starts_with_equals = shared_strings.get(int(value), (None, False))
+        elif data_type in ('str', 'e') and value is not None:
+            error = _error_type(value)
+            starts_with_equals = data_type == 'str' and value.startswith('=')
+        elif data_type == 'inlineStr' and inline is not None:
+            error = _error_type(inline)
+            starts_with_equals = inline.startswith('=')
+
+        # Value as loaded with data_only=False: array and data table formulas
+        # load as objects, not '=' strings
+        if formula is not None:
+            is_formula = formula.get('t') not in ('array', 'dataTable')
+        else:
+            is_formula = starts_with_equals
+
+        if error or is_formula:
+            yield coordinate, error, is_formula
+
+
 def main():
     if len(sys.argv) < 2:
         print("Usage: python recalc.py <excel_file> [timeout_seconds]")